@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+''':class:`blade` optional dependencies and platform differences'''
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# 64-bit signed integer typecode ('q' is missing before Python 3.3)
+try:
+    array('q')
+    _XINTEGER = 'q'
+except ValueError:
+    _XINTEGER = 'l'
+
+# memoryview is missing before Python 2.7
+try:
+    memoryview = memoryview
+except NameError:
+    memoryview = None
@@ -1,30 +1,251 @@
 # -*- coding: utf-8 -*-
 ''':class:`blade` filtering operations'''
 
-from collections import namedtuple
+from array import array
+from weakref import WeakKeyDictionary
+from collections import deque, namedtuple
 from inspect import getmro, isclass
-from itertools import chain, tee, groupby
-from operator import attrgetter, itemgetter
+from itertools import chain, groupby, islice
+from functools import partial
+from operator import attrgetter, itemgetter, truth
 
 from stuf.base import identity
 from stuf.six.moves import filterfalse  # @UnresolvedImport
 from stuf.deep import selfname, members
-from stuf.six import filter, map as xmap, next
+from stuf.six import filter, items, map as xmap, next
 from stuf.collects import OrderedDict, ChainMap
 
+from ._xcompat import _XINTEGER, numpy
+from .xorder import xsort
+from .xpredicate import Expression
+from .xindex import BloomIndex, SortedIndex
+
+# types packed into numeric columns (int and, on Python 2, long)
+_XINTEGERS = frozenset(type(i) for i in (0, 2 ** 64))
+_XNUMBERS = _XINTEGERS | frozenset([float])
+# tests compiled into one callable or evaluated as a NumPy mask
+_XCOMPILED = Expression, SortedIndex, BloomIndex
+
 Group = namedtuple('Group', 'keys groups')
 TrueFalse = namedtuple('TrueFalse', 'true false')
 xmerge = chain.from_iterable
 
 
-def xattrs(iterable, *names):
+def _xcached(cache, introspect, this):
+    '''
+    Introspect class `this` once, keeping what was found until the class is
+    garbage collected or :func:`xinvalidate` forgets it.
+    '''
+    if not isclass(this):
+        return introspect(this)
+    try:
+        return cache[this]
+    except KeyError:
+        found = cache[this] = introspect(this)
+        return found
+    except TypeError:
+        # not weakly referenceable
+        return introspect(this)
+
+
+def _xplaces(this):
+    '''
+    Pair every name :func:`dir` finds on class `this` with the position of the
+    class closest to `this` in its :term:`method resolution order` defining
+    it.
+    '''
+    scopes = [vars(base) for base in _xmro(this)]
+    places = []
+    for name in dir(this):
+        for place, scope in enumerate(scopes):
+            if name in scope:
+                break
+        else:
+            place = None
+        places.append((name, place))
+    return tuple(places)
+
+
+# cached introspection never refers back to its class (only names, positions
+# and bases are kept) so classes can still be garbage collected
+_XCACHES = _XBASES, _XNAMES, _XPLACES = (
+    WeakKeyDictionary(), WeakKeyDictionary(), WeakKeyDictionary(),
+)
+_xbases = partial(_xcached, _XBASES, lambda x: getmro(x)[1:])
+_xnames = partial(_xcached, _XNAMES, lambda x: tuple(dir(x)))
+
+
+def _xmro(this):
+    '''Classes in the :term:`method resolution order` of `this`.'''
+    return (this,) + _xbases(this) if isclass(this) else getmro(this)
+
+
+def _xmembers(this):
+    '''Yield the name and value of every attribute of `this`.'''
+    if not isclass(this):
+        for member in members(this):
+            yield member
+        return
+    for name in _xnames(this):
+        try:
+            yield name, getattr(this, name)
+        except AttributeError:
+            pass
+
+
+def _xresolved(this):
+    '''
+    Yield the name and value of every attribute of class `this`, taking values
+    straight from the class closest to `this` defining them.
+    '''
+    mro = _xmro(this)
+    for name, place in _xcached(_XPLACES, _xplaces, this):
+        if place is not None:
+            scope = vars(mro[place])
+            if name in scope:
+                yield name, scope[name]
+                continue
+        # not defined on a class in the mro or deleted since it was cached
+        try:
+            value = getattr(this, name)
+        except AttributeError:
+            continue
+        yield name, value
+
+
+def _xcolumn(values):
+    '''
+    Pack `values` into a NumPy array or :class:`array.array` if they are all
+    integers or floats, or else leave them in a list.
+    '''
+    kinds = set(xmap(type, values))
+    if kinds <= _XINTEGERS:
+        typecode = _XINTEGER
+    elif kinds <= _XNUMBERS:
+        typecode = 'd'
+    else:
+        return values
+    try:
+        if numpy is not None:
+            return numpy.array(values, typecode)
+        return array(typecode, values)
+    except OverflowError:
+        return values
+
+
+def _xcolumns(rows, width, batch):
+    '''Gather `width` wide `rows` into columns `batch` rows at a time.'''
+    while 1:
+        if width == 1:
+            columns = [list(islice(rows, batch))]
+        else:
+            columns = [[] for _ in range(width)]
+            appends = [column.append for column in columns]
+            for row in islice(rows, batch):
+                for append, value in zip(appends, row):
+                    append(value)
+        if not columns[0]:
+            return
+        yield tuple(xmap(_xcolumn, columns))
+        if batch is None:
+            return
+
+
+def _xcolumnar(rows, width, options):
+    '''Gather `rows` into columns if `options` ask for columnar output.'''
+    columnar = options.pop('columnar', False)
+    batch = options.pop('batch', None)
+    if options:
+        raise TypeError('unexpected keyword argument %r' % min(options))
+    return _xcolumns(rows, width, batch) if columnar else rows
+
+
+def _xmask(iterable, test):
+    '''
+    Evaluate predicate `test` as a mask over `iterable` if it is a
+    one-dimensional NumPy array of numbers, strings or records with every
+    field `test` refers to.
+    '''
+    if (
+        numpy is None or not isinstance(iterable, numpy.ndarray)
+        or iterable.ndim != 1 or iterable.dtype.kind == 'O'
+    ):
+        return None
+    if isinstance(test, Expression) and not test._maskable(iterable.dtype):
+        return None
+    return test.mask(iterable)
+
+
+def xaggregate(iterable, key=None, **reducers):
+    '''
+    Group items in `iterable` using `key` as the :term:`key function`, folding
+    each item into its group's reducers as it arrives instead of keeping it.
+
+    :argument iterable: :term:`iterable`
+
+    :keyword key: :term:`key function`
+
+    :keyword reducers: :class:`~blade.xmath.Accumulator` factories, or pairs of
+      a factory and a :func:`callable` picking the value to reduce out of each
+      item, by the name of their results
+
+    :return: :term:`iterator` of :func:`~collections.namedtuple`\s of
+      ``Group(keys=keys, groups=Aggregate(name=result, ...))`` in the order
+      keys are first seen
+
+    >>> from blade.xfilter import xaggregate
+    >>> from blade.xmath import Mean, Tally
+    >>> from operator import itemgetter
+    >>> sales = [('moe', 10), ('larry', 20), ('moe', 30)]
+    >>> amount = itemgetter(1)
+    >>> for group in xaggregate(
+    ...     sales, itemgetter(0), count=Tally, mean=(Mean, amount),
+    ... ):
+    ...     group
+    Group(keys='moe', groups=Aggregate(count=2, mean=20.0))
+    Group(keys='larry', groups=Aggregate(count=1, mean=20.0))
+    '''
+    names = sorted(reducers)
+    pairs = []
+    for name in names:
+        reducer = reducers[name]
+        pairs.append(
+            reducer if isinstance(reducer, tuple) else (reducer, identity)
+        )
+    Aggregate = namedtuple('Aggregate', names)
+    def aggregator(test, iterable, _g=Group, _a=Aggregate._make):  # @IgnorePep8
+        groups = OrderedDict()
+        for item in iterable:
+            k = test(item)
+            try:
+                folds = groups[k]
+            except KeyError:
+                folds = groups[k] = [(f(), g) for f, g in pairs]
+            for fold, get in folds:
+                fold.update(get(item))
+        popitem = groups.popitem
+        while groups:
+            k, v = popitem(last=False)
+            yield _g(k, _a(fold.result() for fold, _ in v))
+    return aggregator(identity if key is None else key, iterable)
+
+
+def xattrs(iterable, *names, **options):
     '''
     Collect :term:`attribute` values from items in :term:`iterable` that match
     an :term:`attribute` name in `names`.
 
     :argument iterable: :term:`iterable`
     :argument str names: attribute names
-    :return: :term:`iterator` of values
+    :keyword bool columnar: gather values into one column per attribute name
+      (see below)
+    :keyword int batch: most items to gather into each set of columns
+      (default is every item)
+    :return: :term:`iterator` of values or, alternatively, :func:`tuple`\s of
+      columns
+
+    Columns of integers or floats are NumPy arrays if NumPy is installed and
+    :class:`array.array`\s if not. Columns of anything else are lists.
 
     >>> from blade.xfilter import xattrs
     >>> from stuf import stuf
@@ -41,6 +262,10 @@ def xattrs(iterable, *names):
     >>> # no attrs named 'place'
     >>> list(xattrs(stooge, 'place'))
     []
+    >>> # columns
+    >>> names, ages = next(xattrs(stooge, 'name', 'age', columnar=True))
+    >>> names, ages.tolist()
+    (['moe', 'larry', 'curly'], [40, 50, 60])
     '''
     def attrs(iterable, _n=next):
         try:
@@ -52,7 +277,7 @@ def xattrs(iterable, *names):
                     pass
         except StopIteration:
             pass
-    return attrs(iter(iterable))
+    return _xcolumnar(attrs(iter(iterable)), len(names), options)
 
 
 def xfilter(iterable, test, invert=False):
@@ -76,11 +301,21 @@ def xfilter(iterable, test, invert=False):
     >>> # filter for false values
     >>> list(xfilter([1, 2, 3, 4, 5, 6], lambda x: x % 2 == 0, invert=True))
     [1, 3, 5]
+
+    A predicate :class:`~blade.xpredicate.Expression` or membership index
+    from :mod:`blade.xindex` as `test` is compiled into one :func:`callable`
+    or, if `iterable` is a one-dimensional NumPy array, evaluated as a mask
+    over the whole array at once.
     '''
+    if isinstance(test, _XCOMPILED):
+        mask = _xmask(iterable, test)
+        if mask is not None:
+            return iter(iterable[~mask if invert else mask])
+        test = test.compile()
     return (filterfalse if invert else filter)(test, iterable)
 
 
-def xgroup(iterable, test=None):
+def xgroup(iterable, test=None, hashed=False, presorted=False, buffer=None):
     '''
     Group items in `iterable` using `test` as the :term:`key function`.
 
@@ -88,6 +323,16 @@ def xgroup(iterable, test=None):
 
     :argument test: filtering :func:`callable`
 
+    :keyword bool hashed: group items in one pass by hashing their keys rather
+      than sorting them, yielding groups in the order their keys are first
+      seen
+
+    :keyword bool presorted: items in `iterable` are already ordered by key so
+      yield each group as soon as it ends without sorting
+
+    :keyword int buffer: most items to sort in memory before spilling sorted
+      runs to disk (see :func:`~blade.xorder.xsort`)
+
     :return: :term:`iterator` of :func:`~collections.namedtuple`\s of
       ``Group(keys=keys, groups=tuple)``
 
@@ -99,25 +344,81 @@ def xgroup(iterable, test=None):
     >>> # use test for key function
     >>> list(xgroup([1.3, 2.1, 2.4], floor))
     [Group(keys=1.0, groups=(1.3,)), Group(keys=2.0, groups=(2.1, 2.4))]
+    >>> # group by hashing keys
+    >>> list(xgroup([3, 2, 1, 5], lambda x: x % 2, hashed=True))
+    [Group(keys=1, groups=(3, 1, 5)), Group(keys=0, groups=(2,))]
     '''
     def grouper(test, iterable, _n=next, _g=Group, _t=tuple):
         try:
-            it = groupby(sorted(iterable, key=test), test)
+            it = groupby(
+                iterable if presorted else xsort(
+                    iterable, test, buffer=buffer,
+                ),
+                test,
+            )
             while 1:
                 k, v = _n(it)
                 yield _g(k, _t(v))
         except StopIteration:
             pass
-    return grouper(identity if test is None else test, iterable)
+    def hasher(test, iterable, _g=Group, _t=tuple):  # @IgnorePep8
+        groups = OrderedDict()
+        for item in iterable:
+            key = test(item)
+            try:
+                groups[key].append(item)
+            except KeyError:
+                groups[key] = [item]
+        popitem = groups.popitem
+        while groups:
+            k, v = popitem(last=False)
+            yield _g(k, _t(v))
+    return (hasher if hashed else grouper)(
+        identity if test is None else test, iterable,
+    )
+
+
+def xinvalidate(*classes):
+    '''
+    Forget introspection of `classes` and their subclasses cached by
+    :func:`xmembers`, :func:`xmro`, and :func:`xtraverse` so attributes or
+    bases added to or deleted from them since are seen.
+
+    :argument classes: :term:`class`\es (default is every class)
+
+    >>> from blade.xfilter import xinvalidate, xmembers
+    >>> class stooge:
+    ...    name = 'moe'
+    >>> test = lambda x: not x[0].startswith('__')
+    >>> list(xmembers([stooge], test))
+    [('name', 'moe')]
+    >>> stooge.age = 40
+    >>> xinvalidate(stooge)
+    >>> list(xmembers([stooge], test))
+    [('age', 40), ('name', 'moe')]
+    '''
+    stale = set(classes)
+    for cache in _XCACHES:
+        if not stale:
+            cache.clear()
+            continue
+        for cls in [c for c in cache.keys() if stale.intersection(getmro(c))]:
+            del cache[cls]
+
 
-def xitems(iterable, *keys):
+def xitems(iterable, *keys, **options):
     '''
     Collect values from items in :term:`iterable` (usually a :term:`sequence` or
     :term:`mapping`) that match a **key** found in `keys`.
 
     :argument iterable: :term:`iterable`
     :param str keys: keys or indices
-    :return: :term:`iterator` of items
+    :keyword bool columnar: gather values into one column per key like
+      :func:`xattrs`
+    :keyword int batch: most items to gather into each set of columns
+      (default is every item)
+    :return: :term:`iterator` of items or, alternatively, :func:`tuple`\s of
+      columns
 
     >>> from blade.xfilter import xitems
     >>> stooge = [
@@ -138,6 +439,11 @@ def xitems(iterable, *keys):
     [40, 50, 60]
     >>> list(xitems(stooge, 'place'))
     []
+    >>> # columns in batches of two items
+    >>> for ages, in xitems(stooge, 1, columnar=True, batch=2):
+    ...     ages.tolist()
+    [40, 50]
+    [60]
     '''
     def itemz(iterable, _n=next):
         try:
@@ -149,7 +455,7 @@ def xitems(iterable, *keys):
                     pass
         except StopIteration:
             pass
-    return itemz(iter(iterable))
+    return _xcolumnar(itemz(iter(iterable)), len(keys), options)
 
 
 def xmembers(iterable, test, inverse=False):
@@ -182,7 +488,7 @@ def xmembers(iterable, test, inverse=False):
     >>> list(xmembers([stoog3], lambda x: not x[0].startswith('__'))) # doctest: +SKIP
     [('age', 60), ('name', 'curly'), ('stoog4', stoog3.stoog4)]
     '''
-    return xfilter(xmerge(xmap(members, iterable)), test, inverse)
+    return xfilter(xmerge(xmap(_xmembers, iterable)), test, inverse)
 
 
 def xmro(iterable):
@@ -214,10 +520,65 @@ def xmro(iterable):
     >>> stoog2 in results
     True
     '''
-    return xmerge(xmap(getmro, iterable))
+    return xmerge(xmap(_xmro, iterable))
 
 
-def xtraverse(iterable, test, invert=False):
+def xpartition(iterable, test, keys=(True, False), buffer=None):
+    '''
+    Divide items in :term:`iterable` into one :term:`iterator` for each key in
+    `keys` by the key `test` gives each item, running `test` only once per
+    item.
+
+    :argument iterable: :term:`iterable`
+
+    :argument test: :term:`key function`
+
+    :keyword keys: keys to collect items for (items with other keys are
+      skipped)
+
+    :keyword int buffer: most items to hold for any :term:`iterator` while
+      reading ahead for another
+
+    :return: :func:`tuple` of :term:`iterator`\s of items in the order of
+      `keys`
+
+    Items are read from `iterable` only when an :term:`iterator` runs out of
+    items, holding items for the other :term:`iterator`\s until they are
+    read. :exc:`OverflowError` is raised if more than `buffer` items pile up
+    for any one :term:`iterator`.
+
+    >>> from blade.xfilter import xpartition
+    >>> small, medium, large = xpartition(
+    ...     [1, 20, 300, 2, 30], lambda x: len(str(x)), (1, 2, 3),
+    ... )
+    >>> list(large), list(small), list(medium)
+    ([300], [1, 2], [20, 30])
+    '''
+    iterable = iter(iterable)
+    queues = dict((key, deque()) for key in keys)
+    def fill(wanted, _n=next):  # @IgnorePep8
+        # read ahead until the wanted queue gets an item or input runs out
+        while not wanted:
+            try:
+                item = _n(iterable)
+            except StopIteration:
+                return False
+            queue = queues.get(test(item))
+            if queue is not None:
+                queue.append(item)
+                if buffer is not None and len(queue) > buffer:
+                    raise OverflowError(
+                        'more than %d items held for one iterator' % buffer
+                    )
+        return True
+    def part(queue):  # @IgnorePep8
+        popleft = queue.popleft
+        while queue or fill(queue):
+            yield popleft()
+    return tuple(part(queues[key]) for key in keys)
+
+
+def xtraverse(iterable, test, invert=False, max_depth=None):
     '''
     Collect values from deeply :term:`nested scope`\s from items in
     :term:`iterable` matched by `test`.
@@ -229,6 +590,9 @@ def xtraverse(iterable, test, invert=False):
     :keyword bool invert: collect items in :term:`iterable` that
       `test` is :data:`False` rather than :data:`True` for
 
+    :keyword int max_depth: deepest level of nested classes to collect values
+      from (default is every level)
+
     :return: :term:`iterator` of `ChainMaps <http://docs.python.org/dev/
       library/collections.html#collections.ChainMap>`_ containing
       :class:`~collections.OrderedDict`
@@ -259,72 +623,61 @@ def xtraverse(iterable, test, invert=False):
     ChainMap(OrderedDict([('classname', 'stooge3'), ('age', 60)]),
     OrderedDict([('age', 969), ('classname', 'stooge4')]))]
     '''
-    ifilter = filterfalse if invert else filter
-    def members(iterable):  # @IgnorePep8
-        mro = getmro(iterable)
-        names = iter(dir(iterable))
-        beenthere = set()
-        adder = beenthere.add
-        try:
-            OD = OrderedDict
-            vz = vars
-            cn = chain
-            ga = getattr
-            ic = isclass
-            nx = next
-            while 1:
-                name = nx(names)
-                # yes, it's really supposed to be a tuple
-                for base in cn([iterable], mro):
-                    var = vz(base)
-                    if name in var:
-                        obj = var[name]
-                        break
-                else:
-                    obj = ga(iterable, name)
-                if (name, obj) in beenthere:
-                    continue
-                else:
-                    adder((name, obj))
-                if ic(obj):
-                    yield name, OD((k, v) for k, v in ifilter(
-                        test, members(obj),
-                    ))
-                else:
-                    yield name, obj
-        except StopIteration:
-            pass
+    keep = (lambda x: not test(x)) if invert else test
+    def expand(this):  # @IgnorePep8
+        _od, _ic, _r = OrderedDict, isclass, _xresolved
+        # walk nested classes with an explicit stack of frames of members
+        # left to visit, the mapping they go into and its name in its parent
+        root = _od()
+        stack = [(_r(this), root, None)]
+        # classes on the stack by identity so cyclic references end the walk
+        path = [this]
+        seen = set([id(this)])
+        while stack:
+            members, mapping, name = stack[-1]
+            for k, v in members:
+                if _ic(v) and id(v) not in seen and (
+                    max_depth is None or len(stack) <= max_depth
+                ):
+                    stack.append((_r(v), _od(), k))
+                    path.append(v)
+                    seen.add(id(v))
+                    break
+                if keep((k, v)):
+                    mapping[k] = v
+            else:
+                stack.pop()
+                seen.discard(id(path.pop()))
+                if stack and keep((name, mapping)):
+                    stack[-1][1][name] = mapping
+        return root
     def traverse(iterable):  # @IgnorePep8
-        try:
-            iterable = iter(iterable)
-            OD = OrderedDict
-            sn = selfname
-            nx = next
-            while 1:
-                iterator = nx(iterable)
-                chaining = ChainMap()
-                chaining['classname'] = sn(iterator)
-                cappend = chaining.maps.append
-                for k, v in ifilter(test, members(iterator)):
-                    if isinstance(v, OD):
-                        v['classname'] = k
-                        cappend(v)
-                    else:
-                        chaining[k] = v
-                yield chaining
-        except StopIteration:
-            pass
+        OD = OrderedDict
+        sn = selfname
+        for this in iterable:
+            chaining = ChainMap()
+            chaining['classname'] = sn(this)
+            cappend = chaining.maps.append
+            for k, v in items(expand(this)):
+                if isinstance(v, OD):
+                    v['classname'] = k
+                    cappend(v)
+                else:
+                    chaining[k] = v
+            yield chaining
     return traverse(iterable)
 
 
-def xtruefalse(iterable, test):
+def xtruefalse(iterable, test, buffer=None):
     '''
     Divide items in :term:`iterable` into two :term:`iterable`\s, the first
     everything `test` is :data:`True` for and the second everything `test` is
-    :data:`False` for.
+    :data:`False` for, running `test` only once per item.
 
     :argument iterable: :term:`iterable`
     :argument test: filtering :func:`callable`
+    :keyword int buffer: most items to hold for one :term:`iterator` while
+      reading ahead for the other (see :func:`xpartition`)
 
     :return: :func:`~collections.namedtuple` of two :term:`iterator`\s, one of
       items for which `test` is :data:`True` and one for which `test` is
@@ -336,6 +689,15 @@ def xtruefalse(iterable, test):
     (2, 4, 6)
     >>> tuple(divide.false)
     (1, 3, 5)
+
+    Predicate :class:`~blade.xpredicate.Expression`\s and membership indexes
+    as `test` are handled like :func:`xfilter` handles them.
     '''
-    truth, false = tee(iterable)
-    return TrueFalse(filter(test, truth), filterfalse(test, false))
+    if isinstance(test, _XCOMPILED):
+        mask = _xmask(iterable, test)
+        if mask is not None:
+            return TrueFalse(iter(iterable[mask]), iter(iterable[~mask]))
+        test = test.compile()
+    return TrueFalse(*xpartition(
+        iterable, lambda x: truth(test(x)), (True, False), buffer,
+    ))
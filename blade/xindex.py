@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+''':class:`blade` membership indexes'''
+
+from mmap import mmap, ACCESS_READ
+from array import array
+from math import ceil, log
+from bisect import bisect_left
+from itertools import groupby
+from struct import calcsize, pack, unpack
+
+from stuf.six import map as xmap, range
+
+from ._xcompat import _XINTEGER, memoryview, numpy
+from .xmath import _xhash
+from .xorder import xsort
+
+# saved index headers: magic, typecode and, for Bloom filters, their shape
+_XSORTED = '<6sc1x'
+_XBLOOM = '<6s2xQQQ'
+# most integers a SortedIndex sorts in memory without NumPy
+_XBUFFER = 1048576
+
+
+def _xsave(path, header, payload):
+    '''Write `header` and the raw bytes of `payload` to the file at `path`.'''
+    with open(path, 'wb') as saved:
+        saved.write(header)
+        saved.write(payload)
+
+
+def _xview(mapped, offset, typecode):
+    '''
+    Items of `typecode` in `mapped` from `offset` on, read in place through
+    :meth:`memoryview.cast` (Python 3.3+) or NumPy and otherwise copied into
+    an :class:`array.array`.
+    '''
+    if hasattr(memoryview, 'cast'):
+        return memoryview(mapped)[offset:].cast(typecode)
+    if numpy is not None:
+        return numpy.frombuffer(mapped, typecode, offset=offset)
+    items = array(typecode)
+    # Python 2 names frombytes fromstring
+    read = getattr(items, 'frombytes', None) or items.fromstring
+    read(mapped[offset:])
+    mapped.close()
+    return items
+
+
+def _xload(path, layout, magic, typecode):
+    '''
+    Memory-map the index saved at `path`, unpacking its header with struct
+    `layout` once it is checked to start with `magic`.
+
+    :return: header fields and items of `typecode` in everything after it
+    '''
+    with open(path, 'rb') as saved:
+        mapped = mmap(saved.fileno(), 0, access=ACCESS_READ)
+    size = calcsize(layout)
+    if mapped[:len(magic)] != magic or len(mapped) < size:
+        mapped.close()
+        raise ValueError('%r is not a saved %s' % (path, magic.decode()))
+    fields = unpack(layout, mapped[:size])[1:]
+    if typecode is None:
+        # the typecode is saved in the header
+        typecode = fields[0].decode('ascii')
+    return fields, _xview(mapped, size, typecode)
+
+
+class SortedIndex(object):
+
+    '''
+    Exact membership index over integers kept in one sorted
+    :class:`array.array` and searched by bisection, taking the size of a
+    machine integer per item rather than the several dozen bytes per item
+    of a :func:`set`.
+
+    Indexes are tests for :func:`~blade.xfilter.xfilter`,
+    :func:`~blade.xfilter.xtruefalse`, and
+    :meth:`~blade.xpredicate.Expression.isin`.
+
+    :argument iterable: :term:`iterable` of integers
+    :keyword str typecode: :class:`array.array` typecode of the integers
+      (default is 64-bit signed integers)
+    :keyword int buffer: most integers to sort in memory while building the
+      index (see :func:`~blade.xorder.xsort`; default is all of them with
+      NumPy and 1048576 without it)
+
+    >>> from blade.xindex import SortedIndex
+    >>> index = SortedIndex([11, 3, 5, 11, 7])
+    >>> 5 in index, 6 in index
+    (True, False)
+    >>> len(index)
+    4
+    '''
+
+    __slots__ = ('typecode', '_items')
+
+    def __init__(self, iterable=(), typecode=None, buffer=None):
+        self.typecode = typecode = typecode or _XINTEGER
+        if numpy is not None and buffer is None:
+            self._items = array(typecode, numpy.unique(
+                numpy.fromiter(iterable, typecode)
+            ).tobytes())
+        else:
+            if buffer is None:
+                buffer = _XBUFFER
+            self._items = array(typecode, (
+                k for k, _ in groupby(xsort(iterable, buffer=buffer))
+            ))
+
+    def __contains__(self, item, _b=bisect_left):
+        items = self._items
+        i = _b(items, item)
+        return i != len(items) and items[i] == item
+
+    # test items by calling the index
+    __call__ = __contains__
+
+    def __len__(self):
+        return len(self._items)
+
+    def compile(self):
+        '''
+        Membership test as one :func:`callable`.
+
+        :return: :func:`callable`
+        '''
+        return self.__contains__
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Memory-map a read-only index saved with :meth:`save` so its integers
+        are paged in from disk as they are searched. Python versions before
+        3.3 without NumPy read the integers into memory instead.
+
+        :argument str path: path of the saved index
+        :return: :class:`SortedIndex`
+        '''
+        (typecode,), items = _xload(path, _XSORTED, b'bladeS', None)
+        index = cls.__new__(cls)
+        index.typecode = typecode.decode('ascii')
+        index._items = items
+        return index
+
+    def mask(self, values):
+        '''
+        Test every item in `values` at once.
+
+        :argument values: NumPy array
+        :return: NumPy boolean array
+        '''
+        if numpy is None:
+            raise ImportError('mask() needs NumPy')
+        items = numpy.frombuffer(self._items, self.typecode)
+        values = numpy.asarray(values)
+        if not len(items):
+            return numpy.zeros(values.shape, bool)
+        found = numpy.searchsorted(items, values).clip(0, len(items) - 1)
+        return items[found] == values
+
+    def save(self, path):
+        '''
+        Save the index to the file at `path`.
+
+        :argument str path: path of the saved index
+        '''
+        _xsave(
+            path, pack(_XSORTED, b'bladeS', self.typecode.encode('ascii')),
+            self._items,
+        )
+
+
+class BloomIndex(object):
+
+    '''
+    Probabilistic membership index (`Bloom filter <http://dl.acm.org/
+    citation.cfm?id=362692>`_) answering in fixed memory whether an item may
+    have been added to it.
+
+    An added item is always found. An item never added is wrongly found with
+    probability of about `error` once `capacity` items are added. Items are
+    hashed through their :func:`repr` like :class:`~blade.xmath.CountMin`.
+
+    Indexes are tests for :func:`~blade.xfilter.xfilter`,
+    :func:`~blade.xfilter.xtruefalse`, and
+    :meth:`~blade.xpredicate.Expression.isin`.
+
+    :keyword int capacity: number of items expected to be added
+    :keyword float error: rate of wrongly found items at `capacity`
+    :keyword int seed: hash seed
+
+    >>> from blade.xindex import BloomIndex
+    >>> index = BloomIndex(100).extend(['moe', 'larry', 'curly'])
+    >>> 'moe' in index, 'shemp' in index
+    (True, False)
+    '''
+
+    __slots__ = ('width', 'depth', 'seed', '_bits')
+
+    def __init__(self, capacity=1000000, error=0.01, seed=0):
+        ln2 = log(2)
+        self.width = max(int(ceil(-capacity * log(error) / (ln2 * ln2))), 8)
+        self.depth = max(int(round(self.width * ln2 / max(capacity, 1))), 1)
+        self.seed = seed
+        self._bits = bytearray((self.width + 7) // 8)
+
+    def _cells(self, item):
+        if numpy is not None and isinstance(item, numpy.generic):
+            # hash NumPy scalars like the Python numbers they hold
+            item = item.item()
+        # double hashing derives every bit from one digest
+        first, second = _xhash(item, self.seed)
+        width = self.width
+        return [(first + i * second) % width for i in range(self.depth)]
+
+    def __contains__(self, item):
+        bits = self._bits
+        for cell in self._cells(item):
+            if not bits[cell >> 3] & (1 << (cell & 7)):
+                return False
+        return True
+
+    # test items by calling the index
+    __call__ = __contains__
+
+    def compile(self):
+        '''
+        Membership test as one :func:`callable`.
+
+        :return: :func:`callable`
+        '''
+        return self.__contains__
+
+    def extend(self, iterable):
+        '''
+        Add every item in `iterable` to the index.
+
+        :argument iterable: iterable object
+        :return: this index
+        '''
+        bits = self._bits
+        cells = self._cells
+        for item in iterable:
+            for cell in cells(item):
+                bits[cell >> 3] |= 1 << (cell & 7)
+        return self
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Memory-map a read-only index saved with :meth:`save`.
+
+        :argument str path: path of the saved index
+        :return: :class:`BloomIndex`
+        '''
+        (width, depth, seed), bits = _xload(path, _XBLOOM, b'bladeB', 'B')
+        index = cls.__new__(cls)
+        index.width, index.depth, index.seed = width, depth, seed
+        index._bits = bits
+        return index
+
+    def mask(self, values):
+        '''
+        Test every item in `values` as a NumPy mask. Items are still hashed
+        one at a time.
+
+        :argument values: NumPy array
+        :return: NumPy boolean array
+        '''
+        if numpy is None:
+            raise ImportError('mask() needs NumPy')
+        values = numpy.asarray(values)
+        return numpy.fromiter(
+            xmap(self.__contains__, values.tolist()), bool, len(values),
+        )
+
+    def save(self, path):
+        '''
+        Save the index to the file at `path`.
+
+        :argument str path: path of the saved index
+        '''
+        _xsave(
+            path, pack(_XBLOOM, b'bladeB', self.width, self.depth, self.seed),
+            self._bits,
+        )
+
+    def update(self, item):
+        '''
+        Add `item` to the index.
+
+        :argument item: an item
+        :return: this index
+        '''
+        return self.extend((item,))
+
+
+def xindex(
+    iterable, exact=True, capacity=None, error=0.01, seed=0, buffer=None,
+):
+    '''
+    Build a compact membership index over items in `iterable` to use as a test
+    for :func:`~blade.xfilter.xfilter` in place of a :func:`set`.
+
+    :argument iterable: :term:`iterable` (of integers for exact indexes)
+    :keyword bool exact: build an exact :class:`SortedIndex` rather than a
+      probabilistic :class:`BloomIndex`
+    :keyword int capacity: number of items a :class:`BloomIndex` is sized for
+      (default is the length of `iterable`)
+    :keyword float error: rate of items wrongly found by a :class:`BloomIndex`
+    :keyword int seed: :class:`BloomIndex` hash seed
+    :keyword int buffer: most integers a :class:`SortedIndex` sorts in memory
+      while being built (default is all of them with NumPy and 1048576
+      without it)
+    :return: :class:`SortedIndex` or, alternatively, :class:`BloomIndex`
+
+    >>> from blade.xindex import xindex
+    >>> from blade.xfilter import xfilter
+    >>> allowed = xindex([11, 3, 5, 7])
+    >>> list(xfilter([1, 3, 5, 8, 11], allowed))
+    [3, 5, 11]
+    >>> list(xfilter(['moe', 'shemp'], xindex(['moe', 'larry'], False)))
+    ['moe']
+    '''
+    if exact:
+        return SortedIndex(iterable, buffer=buffer)
+    if capacity is None:
+        try:
+            capacity = len(iterable)
+        except TypeError:
+            raise TypeError('xindex() needs a capacity for this iterable')
+    return BloomIndex(capacity, error, seed).extend(iterable)
@@ -1,42 +1,1075 @@
 # -*- coding: utf-8 -*-
 ''':class:`blade` mathing operations.'''
 
-from math import fsum
-from itertools import tee
-from operator import truediv
-from collections import deque, namedtuple
+from math import ceil, e, fsum, log, sqrt
+from array import array
+from hashlib import md5
+from struct import unpack
+from bisect import bisect_left
+from random import Random, sample
+from itertools import chain, islice, repeat
+from heapq import heappush, heappop, nlargest, nsmallest
+from operator import add, truediv, gt, itemgetter
+from collections import namedtuple
+from abc import ABCMeta, abstractmethod
 
-from stuf.six import next
-from stuf.iterable import count
+from stuf.base import issequence
+from stuf.six import items, map as xmap, next
 from stuf.collects import Counter
 
-from .xslice import xslicer
+from ._xcompat import memoryview, numpy
+from .xorder import _xsorted
+
+try:
+    array('Q')
+    _XCOUNTER = 'Q'
+except ValueError:
+    _XCOUNTER = 'L'
+
+# most items of a NumPy array converted to Python numbers at once
+_XBLOCK = 65536
 
 Count = namedtuple('Count', 'least most overall')
 MinMax = namedtuple('MinMax', 'min max')
 
 
-def xaverage(iterable):
+def _xselect(data, k, _s=sample, _m=xmap, _g=gt, _p=repeat):
+    '''
+    Find the `k`th and `k + 1`th smallest items in sequence `data` in expected
+    linear time (Floyd-Rivest selection).
+    '''
+    # smallest item known to sit above the current partition
+    above = None
+    while 1:
+        length = len(data)
+        if length <= 1024:
+            data = sorted(data)
+            return data[k], data[k + 1] if k + 1 < length else above
+        # bracket the `k`th item between two items from a sorted sample
+        size = int(length ** 0.66)
+        picks = sorted(_s(data, size))
+        rank = k * size // length
+        gap = int(size ** 0.5)
+        low = picks[max(rank - gap, 0)]
+        high = picks[min(rank + gap, size - 1)]
+        # count items below the bracket without copying them
+        below = sum(_m(_g, _p(low, length), data))
+        if k < below:
+            above = low
+            data = [i for i in data if i < low]
+            continue
+        middle = [i for i in data if not i < low and not high < i]
+        if k >= below + len(middle):
+            k -= below + len(middle)
+            data = [i for i in data if high < i]
+            continue
+        k -= below
+        if k + 1 == len(middle):
+            higher = [i for i in data if high < i]
+            if higher:
+                above = min(higher)
+        if len(middle) == length:
+            # bracket spans every item so split off its top instead
+            if not low < high:
+                return low, low if k + 1 < length else above
+            data = [i for i in middle if i < high]
+            if k >= len(data):
+                return high, high if k + 1 < length else above
+            above = high
+            continue
+        data = middle
+
+
+# abstract base keeping accumulators free of an instance __dict__
+_XAbstract = ABCMeta('_XAbstract', (object,), {'__slots__': ()})
+
+
+class Accumulator(_XAbstract):
+
+    '''
+    Base for mergeable partial aggregates that can be updated item by item,
+    combined across shards or processes, and pickled.
+
+    Aggregates must define :meth:`merge`, :meth:`result` and :meth:`update`
+    and may define a faster :meth:`extend`.
+
+    Invertible aggregates also define a ``discard(item)`` method taking an
+    item back out of the aggregate, such as when it slides out of a window.
+    Others leave :attr:`discard` as :const:`None`.
+    '''
+
+    __slots__ = ()
+
+    # aggregates that can take items back out override this with a method
+    discard = None
+
+    def __getstate__(self):
+        return dict(
+            (k, getattr(self, k)) for cls in type(self).__mro__
+            for k in getattr(cls, '__slots__', ())
+        )
+
+    def __setstate__(self, state):
+        for k, v in items(state):
+            setattr(self, k, v)
+
+    def extend(self, iterable):
+        '''
+        Add every item in `iterable` to the aggregate.
+
+        :argument iterable: iterable object
+        :return: this aggregate
+        '''
+        update = self.update
+        for item in iterable:
+            update(item)
+        return self
+
+    @abstractmethod
+    def merge(self, other):
+        '''
+        Fold another aggregate of the same kind into this aggregate.
+
+        :argument other: aggregate
+        :return: this aggregate
+        '''
+
+    @abstractmethod
+    def result(self):
+        '''Final value of the aggregate.'''
+
+    @abstractmethod
+    def update(self, item):
+        '''
+        Add `item` to the aggregate.
+
+        :argument item: an item
+        :return: this aggregate
+        '''
+
+
+class Commonality(Accumulator):
+
+    '''
+    Mergeable tally of how common each item is.
+
+    >>> from blade.xmath import Commonality
+    >>> common = Commonality().extend([11, 3, 5, 11])
+    >>> common.merge(Commonality().extend([7, 3, 5, 11])).result().most
+    11
+    '''
+
+    __slots__ = ('counter',)
+
+    def __init__(self):
+        self.counter = Counter()
+
+    def extend(self, iterable):
+        self.counter.update(iterable)
+        return self
+
+    def merge(self, other):
+        self.counter.update(other.counter)
+        return self
+
+    def result(self):
+        '''
+        :return: :func:`~collections.namedtuple` ``Count(least=int, most=int,
+          overall=[(thing1, int), (thing2, int), ...])``
+        '''
+        return _xcommon(self.counter)
+
+    def update(self, item):
+        self.counter[item] += 1
+        return self
+
+
+class CountMin(Accumulator):
+
+    '''
+    Mergeable `Count-Min <http://dimacs.rutgers.edu/~graham/pubs/papers/
+    cm-full.pdf>`_ sketch (with conservative update) estimating how often any
+    item occurs in a stream in fixed memory.
+
+    An estimate is never too low and, with probability ``1 - delta``, is too
+    high by at most ``epsilon * count``. Items are hashed through their
+    :func:`repr`, which must therefore be stable across processes for sketches
+    to merge.
+
+    :keyword float epsilon: error as a fraction of the number of items seen
+    :keyword float delta: probability the error is exceeded
+    :keyword int seed: hash seed (sketches merge only with the same seed)
+
+    >>> from blade.xmath import CountMin
+    >>> sketch = CountMin().extend([11, 3, 5, 11, 7, 3, 5, 11])
+    >>> sketch.merge(CountMin().extend([11])).estimate(11)
+    4
+    '''
+
+    __slots__ = ('width', 'depth', 'seed', 'count', '_rows')
+
+    def __init__(self, epsilon=0.001, delta=0.01, seed=0):
+        self.width = int(ceil(e / epsilon))
+        self.depth = int(ceil(log(1.0 / delta)))
+        self.seed = seed
+        self.count = 0
+        self._rows = [
+            array(_XCOUNTER, repeat(0, self.width)) for _ in range(self.depth)
+        ]
+
+    def _cells(self, item):
+        # double hashing derives every row's column from one digest
+        first, second = _xhash(item, self.seed)
+        width = self.width
+        return [(first + i * second) % width for i in range(self.depth)]
+
+    def estimate(self, item):
+        '''
+        Estimated count of `item`.
+
+        :argument item: an item
+        :return: :func:`int`
+        '''
+        return min(
+            row[cell] for row, cell in zip(self._rows, self._cells(item))
+        )
+
+    def extend(self, iterable):
+        rows = self._rows
+        cells = self._cells
+        for item in iterable:
+            columns = cells(item)
+            # conservative update only raises the counters that must rise
+            least = min(row[i] for row, i in zip(rows, columns)) + 1
+            for row, i in zip(rows, columns):
+                if row[i] < least:
+                    row[i] = least
+            self.count += 1
+        return self
+
+    def merge(self, other, _m=xmap):
+        if (self.width, self.depth, self.seed) != (
+            other.width, other.depth, other.seed
+        ):
+            raise ValueError('sketches differ in size or seed')
+        self._rows = [
+            array(_XCOUNTER, _m(add, row, more))
+            for row, more in zip(self._rows, other._rows)
+        ]
+        self.count += other.count
+        return self
+
+    def result(self):
+        '''
+        :return: this sketch, to ask for estimates with :meth:`estimate`
+        '''
+        return self
+
+    def update(self, item):
+        return self.extend((item,))
+
+
+class Extremes(Accumulator):
+
+    '''
+    Mergeable minimum and maximum.
+
+    :keyword key: :term:`key function`
+
+    >>> from blade.xmath import Extremes
+    >>> extremes = Extremes().extend([10, 5, 100])
+    >>> extremes.merge(Extremes().extend([2, 1000])).result()
+    MinMax(min=2, max=1000)
+    '''
+
+    __slots__ = ('key', '_found')
+
+    def __init__(self, key=None):
+        self.key = key
+        # (minimum key, minimum, maximum key, maximum)
+        self._found = None
+
+    def _combine(self, found):
+        if self._found is None:
+            self._found = found
+            return
+        lowkey, low, highkey, high = self._found
+        if found[0] < lowkey:
+            lowkey, low = found[0], found[1]
+        if highkey < found[2]:
+            highkey, high = found[2], found[3]
+        self._found = lowkey, low, highkey, high
+
+    def extend(self, iterable):
+        iterable = iter(iterable)
+        for item in iterable:
+            self._combine(_xminmax(chain((item,), iterable), self.key))
+            break
+        return self
+
+    def merge(self, other):
+        if other._found is not None:
+            self._combine(other._found)
+        return self
+
+    def result(self):
+        '''
+        :return: :func:`~collections.namedtuple` ``MinMax(min=value,
+          max=value)``
+        '''
+        if self._found is None:
+            raise ValueError('no items seen')
+        return MinMax(*self._found[1::2])
+
+    def update(self, item):
+        key = item if self.key is None else self.key(item)
+        self._combine((key, item, key, item))
+        return self
+
+
+class HeavyHitters(Accumulator):
+
+    '''
+    Mergeable `Space-Saving <http://www.cs.ucsb.edu/research/tech_reports/
+    reports/2005-23.pdf>`_ summary of the `k` most frequent items in a stream.
+
+    Only `k` items are ever tracked. The count of a tracked item overestimates
+    its true count by at most :meth:`error`, which never exceeds ``count / k``.
+    Every item occurring more than ``count / k`` times is always tracked.
+
+    :argument int k: number of items to track
+
+    >>> from blade.xmath import HeavyHitters
+    >>> hitters = HeavyHitters(2).extend([11, 3, 11, 5, 11, 7, 11, 3])
+    >>> hitters.result().overall
+    [(11, 4), (3, 4)]
+    >>> # count of 11 is exact but count of 3 may be overestimated by 3
+    >>> hitters.error(11), hitters.error(3)
+    (0, 3)
+    '''
+
+    __slots__ = ('k', 'count', '_counts', '_errors', '_buckets', '_floor')
+
+    def __init__(self, k):
+        if k < 1:
+            raise ValueError('k must be at least 1')
+        self.k = k
+        # total number of items seen
+        self.count = 0
+        self._counts = {}
+        self._errors = {}
+        # tracked items bucketed by count to find the least one quickly
+        self._buckets = {}
+        self._floor = 0
+
+    def _rebuild(self):
+        buckets = self._buckets = {}
+        for item, count in items(self._counts):
+            buckets.setdefault(count, {})[item] = None
+        self._floor = min(buckets) if buckets else 0
+
+    def error(self, item):
+        '''
+        Most the count of `item` may be overestimated by.
+
+        :argument item: an item
+        :return: :func:`int`
+        '''
+        errors = self._errors
+        if item in errors:
+            return errors[item]
+        # untracked items were evicted only once the summary filled up
+        return self._floor if len(self._counts) >= self.k else 0
+
+    def estimate(self, item):
+        '''
+        Estimated count of `item`.
+
+        :argument item: an item
+        :return: :func:`int`
+        '''
+        return self._counts.get(item, 0)
+
+    def merge(self, other):
+        # untracked items count at most the least tracked count of a full
+        # summary (Agarwal et al.)
+        floor = self._floor if len(self._counts) >= self.k else 0
+        otherfloor = other._floor if len(other._counts) >= other.k else 0
+        counts = dict(
+            (i, c + otherfloor) for i, c in items(self._counts)
+        )
+        errors = dict(
+            (i, e + otherfloor) for i, e in items(self._errors)
+        )
+        for item, count in items(other._counts):
+            if item in self._counts:
+                counts[item] += count - otherfloor
+                errors[item] += other._errors[item] - otherfloor
+            else:
+                counts[item] = count + floor
+                errors[item] = other._errors[item] + floor
+        kept = sorted(items(counts), key=itemgetter(1), reverse=True)[:self.k]
+        self._counts = dict(kept)
+        self._errors = dict((i, errors[i]) for i, _ in kept)
+        self.count += other.count
+        self._rebuild()
+        return self
+
+    def result(self):
+        '''
+        :return: :func:`~collections.namedtuple` ``Count(least=int, most=int,
+          overall=[(thing1, int), (thing2, int), ...])`` of tracked items
+        '''
+        return _xcommon(Counter(self._counts))
+
+    def update(self, item):
+        counts = self._counts
+        buckets = self._buckets
+        self.count += 1
+        if item in counts:
+            count = counts[item]
+            bucket = buckets[count]
+            del bucket[item]
+            if not bucket:
+                del buckets[count]
+                if count == self._floor:
+                    self._floor = count + 1
+        elif len(counts) < self.k:
+            count = self._errors[item] = 0
+            self._floor = 1
+        else:
+            # replace a least common item and inherit its count as error
+            count = self._floor
+            bucket = buckets[count]
+            evicted = next(iter(bucket))
+            del bucket[evicted], counts[evicted], self._errors[evicted]
+            self._errors[item] = count
+            if not bucket:
+                del buckets[count]
+                self._floor = count + 1
+        counts[item] = count + 1
+        buckets.setdefault(count + 1, {})[item] = None
+        return self
+
+
+class Mean(Accumulator):
+
+    '''
+    Mergeable arithmetic mean.
+
+    >>> from blade.xmath import Mean
+    >>> Mean().extend([10, 40]).merge(Mean().extend([45])).result()
+    31.666666666666668
+    '''
+
+    __slots__ = ('total', 'count')
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def extend(self, iterable):
+        total, count = self.total, self.count
+        for item in iterable:
+            total += item
+            count += 1
+        self.total, self.count = total, count
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self.count += other.count
+        return self
+
+    def result(self):
+        return truediv(self.total, self.count)
+
+    def update(self, item):
+        self.total += item
+        self.count += 1
+        return self
+
+
+class Moments(Accumulator):
+
+    '''
+    Mergeable accumulator of the count, mean, and second through fourth central
+    moments of numbers, updated in one numerically stable pass (Welford).
+
+    >>> from blade.xmath import Moments
+    >>> moments = Moments().extend([2, 4, 4, 4])
+    >>> moments.merge(Moments().extend([5, 5, 7, 9])).mean
+    5.0
+    >>> moments.variance(population=True)
+    4.0
+    >>> moments.stddev(population=True)
+    2.0
+    '''
+
+    __slots__ = ('count', 'mean', '_m2', '_m3', '_m4')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = self._m3 = self._m4 = 0.0
+
+    def extend(self, iterable):
+        '''
+        Add every number in `iterable` to the moments.
+
+        :argument iterable: iterable object
+        :return: these moments
+        '''
+        n, mean, m2, m3, m4 = (
+            self.count, self.mean, self._m2, self._m3, self._m4,
+        )
+        for item in iterable:
+            n1 = n
+            n += 1
+            delta = item - mean
+            dn = delta / n
+            dn2 = dn * dn
+            term = delta * dn * n1
+            mean += dn
+            m4 += term * dn2 * (n * n - 3 * n + 3) + 6 * dn2 * m2 - 4 * dn * m3
+            m3 += term * dn * (n - 2) - 3 * dn * m2
+            m2 += term
+        self.count, self.mean, self._m2, self._m3, self._m4 = (
+            n, mean, m2, m3, m4,
+        )
+        return self
+
+    def kurtosis(self):
+        '''
+        Excess kurtosis of the numbers seen so far.
+
+        :return: a number
+        '''
+        if not self._m2:
+            raise ValueError('kurtosis needs at least two distinct numbers')
+        return self.count * self._m4 / (self._m2 * self._m2) - 3.0
+
+    def merge(self, other):
+        '''
+        Fold another :class:`Moments` into these moments (Chan et al.).
+
+        :argument other: :class:`Moments`
+        :return: these moments
+        '''
+        na, nb = self.count, other.count
+        if not nb:
+            return self
+        if not na:
+            self.__setstate__(other.__getstate__())
+            return self
+        n = na + nb
+        delta = other.mean - self.mean
+        delta2 = delta * delta
+        ma2, ma3 = self._m2, self._m3
+        mb2, mb3 = other._m2, other._m3
+        self._m4 += other._m4 + (
+            delta2 * delta2 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+            + 6.0 * delta2 * (na * na * mb2 + nb * nb * ma2) / (n * n)
+            + 4.0 * delta * (na * mb3 - nb * ma3) / n
+        )
+        self._m3 += mb3 + (
+            delta2 * delta * na * nb * (na - nb) / (n * n)
+            + 3.0 * delta * (na * mb2 - nb * ma2) / n
+        )
+        self._m2 += mb2 + delta2 * na * nb / n
+        self.mean += delta * nb / n
+        self.count = n
+        return self
+
+    def result(self):
+        '''Sample variance of the numbers seen so far.'''
+        return self.variance()
+
+    def skew(self):
+        '''
+        Skewness of the numbers seen so far.
+
+        :return: a number
+        '''
+        if not self._m2:
+            raise ValueError('skew needs at least two distinct numbers')
+        return sqrt(self.count) * self._m3 / self._m2 ** 1.5
+
+    def stddev(self, population=False):
+        '''
+        Standard deviation of the numbers seen so far.
+
+        :keyword bool population: population rather than sample deviation
+        :return: a number
+        '''
+        return sqrt(self.variance(population))
+
+    def update(self, item):
+        '''
+        Add number `item` to the moments.
+
+        :argument item: a number
+        :return: these moments
+        '''
+        return self.extend((item,))
+
+    def variance(self, population=False):
+        '''
+        Variance of the numbers seen so far.
+
+        :keyword bool population: population rather than sample variance
+        :return: a number
+        '''
+        n = self.count if population else self.count - 1
+        if n < 1:
+            raise ValueError('variance needs at least %d numbers' % (
+                1 if population else 2
+            ))
+        return self._m2 / n
+
+
+class QuantileSketch(Accumulator):
+
+    '''
+    Mergeable `KLL <http://arxiv.org/abs/1603.05346>`_ sketch that estimates
+    quantiles of an unbounded stream in bounded memory.
+
+    :keyword float accuracy: target rank error as a fraction of the number of
+      items seen (smaller is more accurate but larger)
+    :keyword seed: seed for the sketch's random number generator
+
+    >>> from blade.xmath import QuantileSketch
+    >>> sketch = QuantileSketch().extend(range(1000))
+    >>> other = QuantileSketch().extend(range(1000, 2000))
+    >>> sketch.merge(other).count
+    2000
+    >>> 980 <= sketch.quantile(0.5) <= 1020
+    True
+    '''
+
+    __slots__ = (
+        'k', 'count', '_levels', '_sizes', '_size', '_limit', '_random',
+    )
+
+    def __init__(self, accuracy=0.01, seed=None):
+        # compactor size yielding roughly `accuracy` normalized rank error
+        self.k = max(int(ceil(2.0 / accuracy)), 8)
+        self.count = 0
+        self._levels = []
+        self._size = 0
+        self._random = Random(seed)
+        self._grow(1)
+
+    def _grow(self, height):
+        levels = self._levels
+        while len(levels) < height:
+            levels.append([])
+        # lower levels get geometrically smaller compactors
+        top = len(levels) - 1
+        self._sizes = [
+            max(int(ceil(self.k * (2.0 / 3.0) ** (top - i))), 8)
+            for i in range(len(levels))
+        ]
+        self._limit = sum(self._sizes)
+
+    def _compress(self):
+        levels = self._levels
+        while self._size >= self._limit:
+            for level, stack in enumerate(levels):
+                if len(stack) < self._sizes[level]:
+                    continue
+                if level + 1 == len(levels):
+                    self._grow(level + 2)
+                stack.sort()
+                # odd item out stays behind for the next compaction
+                leftover = stack.pop() if len(stack) % 2 else None
+                # promote every other item at double weight
+                levels[level + 1].extend(stack[self._random.randrange(2)::2])
+                self._size -= len(stack) - len(stack) // 2
+                del stack[:]
+                if leftover is not None:
+                    stack.append(leftover)
+                break
+
+    def extend(self, iterable):
+        '''
+        Add every item in `iterable` to the sketch.
+
+        :argument iterable: iterable object
+        :return: this sketch
+        '''
+        iterable = iter(iterable)
+        while 1:
+            chunk = list(islice(iterable, max(self._limit - self._size, 1)))
+            if not chunk:
+                return self
+            self._levels[0].extend(chunk)
+            self.count += len(chunk)
+            self._size += len(chunk)
+            self._compress()
+
+    def merge(self, other):
+        '''
+        Fold another :class:`QuantileSketch` into this sketch.
+
+        :argument other: :class:`QuantileSketch`
+        :return: this sketch
+        '''
+        self._grow(len(other._levels))
+        for level, stack in enumerate(other._levels):
+            self._levels[level].extend(stack)
+        self.count += other.count
+        self._size += other._size
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        '''
+        Estimate the item at quantile `q`.
+
+        :argument float q: quantile between ``0.0`` and ``1.0``
+        :return: an item
+        '''
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs):
+        '''
+        Estimate the items at each quantile in `qs`.
+
+        :argument qs: iterable of quantiles between ``0.0`` and ``1.0``
+        :return: :func:`list` of items
+        '''
+        if not self.count:
+            raise ValueError('no items in sketch')
+        # items at level `n` stand in for 2 ** n original items
+        weighted = sorted(
+            (item, 1 << level)
+            for level, stack in enumerate(self._levels) for item in stack
+        )
+        ranks = []
+        total = 0
+        for _, weight in weighted:
+            total += weight
+            ranks.append(total)
+        last = len(weighted) - 1
+        return [
+            weighted[min(bisect_left(ranks, q * total), last)][0] for q in qs
+        ]
+
+    def result(self):
+        '''Estimated median of the items seen so far.'''
+        return self.quantile(.5)
+
+    def update(self, item):
+        '''
+        Add `item` to the sketch.
+
+        :argument item: an item
+        :return: this sketch
+        '''
+        self._levels[0].append(item)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._limit:
+            self._compress()
+        return self
+
+
+class Tally(Accumulator):
+
+    '''
+    Mergeable count of items.
+
+    >>> from blade.xmath import Tally
+    >>> Tally().extend('abc').merge(Tally().extend('de')).result()
+    5
+    '''
+
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def discard(self, item):
+        self.count -= 1
+        return self
+
+    def extend(self, iterable):
+        for self.count, _ in enumerate(iterable, self.count + 1):
+            pass
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        return self
+
+    def result(self):
+        return self.count
+
+    def update(self, item):
+        self.count += 1
+        return self
+
+
+class Total(Accumulator):
+
+    '''
+    Mergeable sum of numbers.
+
+    :keyword start: starting number (give it to only one shard)
+    :keyword bool precision: add floats with extended precision so that merged
+      totals exactly match :func:`math.fsum` over every number
+
+    >>> from blade.xmath import Total
+    >>> Total().extend([1, 2]).merge(Total().extend([3])).result()
+    6
+    >>> total = Total(precision=True).extend([.1, .1, .1, .1])
+    >>> total.merge(Total(precision=True).extend([.1, .1, .1, .1])).result()
+    0.8
+    '''
+
+    __slots__ = ('total', 'precision', '_partials')
+
+    def __init__(self, start=0, precision=False):
+        self.total = start
+        self.precision = precision
+        # exact, non-overlapping float partial sums (Shewchuk)
+        self._partials = [float(start)] if precision and start else []
+
+    @property
+    def discard(self):
+        '''
+        Take `item` back out of a precise total. Plain float totals cannot
+        discard exactly so they leave this :const:`None`.
+        '''
+        return self._discard if self.precision else None
+
+    def _discard(self, item):
+        return self.extend((-item,))
+
+    def extend(self, iterable):
+        if not self.precision:
+            self.total = sum(iterable, self.total)
+            return self
+        partials = self._partials
+        for x in iterable:
+            i = 0
+            for y in partials:
+                if abs(x) < abs(y):
+                    x, y = y, x
+                high = x + y
+                low = y - (high - x)
+                if low:
+                    partials[i] = low
+                    i += 1
+                x = high
+            partials[i:] = [x]
+        return self
+
+    def merge(self, other):
+        if self.precision:
+            return self.extend(other._partials)
+        self.total += other.total
+        return self
+
+    def result(self):
+        return fsum(self._partials) if self.precision else self.total
+
+    def update(self, item):
+        if self.precision:
+            return self.extend((item,))
+        self.total += item
+        return self
+
+
+def _xhash(item, seed=0):
+    '''Hash `item` into two 64-bit numbers stable across processes.'''
+    return unpack(
+        '<QQ', md5(('%d:%r' % (seed, item)).encode('utf-8')).digest(),
+    )
+
+
+def _xminmax(iterable, key=None, _n=next):
+    '''
+    Find the smallest and largest items in `iterable` and their keys in one
+    pass of about three comparisons for every two items.
+    '''
+    vector = None if key is not None else _xarray(iterable)
+    if vector is not None and len(vector):
+        low, high = vector.min().item(), vector.max().item()
+        return low, low, high, high
+    iterable = iter(iterable)
+    try:
+        low = high = _n(iterable)
+    except StopIteration:
+        raise ValueError('arg is an empty iterable')
+    if key is None:
+        for first in iterable:
+            # odd item out gets paired with itself
+            second = _n(iterable, first)
+            # order each pair before comparing it with the extremes
+            if second < first:
+                if second < low:
+                    low = second
+                if high < first:
+                    high = first
+            else:
+                if first < low:
+                    low = first
+                if high < second:
+                    # first item wins ties like max()
+                    high = second if first < second else first
+        return low, low, high, high
+    lowkey = highkey = key(low)
+    for first in iterable:
+        second = _n(iterable, first)
+        firstkey = key(first)
+        secondkey = firstkey if second is first else key(second)
+        if secondkey < firstkey:
+            if secondkey < lowkey:
+                low, lowkey = second, secondkey
+            if highkey < firstkey:
+                high, highkey = first, firstkey
+        else:
+            if firstkey < lowkey:
+                low, lowkey = first, firstkey
+            if highkey < secondkey:
+                if firstkey < secondkey:
+                    high, highkey = second, secondkey
+                else:
+                    high, highkey = first, firstkey
+    return lowkey, low, highkey, high
+
+
+def _xarray(iterable):
+    '''
+    View `iterable` as a one-dimensional numeric NumPy array if NumPy is
+    installed and `iterable` is a NumPy array, :class:`array.array`, or another
+    object supporting the buffer protocol.
+    '''
+    if numpy is None:
+        return None
+    if not isinstance(iterable, numpy.ndarray):
+        if memoryview is None:
+            return None
+        try:
+            iterable = numpy.asarray(memoryview(iterable))
+        except (TypeError, ValueError):
+            return None
+    if iterable.ndim != 1 or iterable.dtype.kind not in 'iuf':
+        return None
+    return iterable
+
+
+def _xitems(vector, _b=_XBLOCK):
+    '''
+    Iterate over NumPy `vector` as Python numbers, converting a block at a
+    time.
+    '''
+    return chain.from_iterable(
+        vector[i:i + _b].tolist() for i in range(0, len(vector), _b)
+    )
+
+
+def _xtotals(vector, _b=_XBLOCK):
+    '''
+    Yield the position of each block of NumPy `vector` and the running float
+    totals over it, adding in the same order as a Python loop.
+    '''
+    total = 0.0
+    for i in range(0, len(vector), _b):
+        # start each block from the total carried over from the last one
+        totals = numpy.cumsum(
+            numpy.concatenate(([total], vector[i:i + _b])), dtype=float,
+        )[1:]
+        total = totals[-1].item()
+        yield i, totals
+
+
+def _xrank(iterable, k, key, largest):
+    '''Find the `k` largest or smallest items in `iterable` in rank order.'''
+    if key is None and k > 0:
+        vector = _xarray(iterable)
+        if vector is not None:
+            # partition around the kth item in linear time, then sort k items
+            if k < len(vector):
+                if largest:
+                    vector = numpy.partition(vector, len(vector) - k)[-k:]
+                else:
+                    vector = numpy.partition(vector, k - 1)[:k]
+            vector = numpy.sort(vector)
+            return (vector[::-1] if largest else vector).tolist()
+    return (nlargest if largest else nsmallest)(k, iterable, key=key)
+
+
+def _xcommon(counter):
+    '''Summarize how common each item counted in `counter` is.'''
+    commonality = counter.most_common()
+    return Count(
+        # least common
+        commonality[-1][0],
+        # most common (mode)
+        commonality[0][0],
+        # overall commonality
+        commonality,
+    )
+
+
+def xaverage(iterable, running=False):
     '''
     Discover average value of numbers in `iterable`.
 
     :argument iterable: iterable object
-    :return: a number
+    :keyword bool running: return an :term:`iterator` of the average of every
+      item seen so far after each item in `iterable`
+    :return: a number or, alternatively, :term:`iterator` of numbers
 
     >>> from blade.xmath import xaverage
     >>> xaverage([10, 40, 45])
     31.666666666666668
+    >>> # running average
+    >>> list(xaverage([10, 40, 45], running=True))
+    [10.0, 25.0, 31.666666666666668]
     '''
-    i1, i2 = tee(iterable)
-    return truediv(sum(i1, 0.0), count(i2))
+    def averager(iterable, _n=next, _t=truediv):
+        total = 0.0
+        length = 0
+        try:
+            while 1:
+                total += _n(iterable)
+                length += 1
+                yield _t(total, length)
+        except StopIteration:
+            pass
+    vector = _xarray(iterable)
+    if vector is not None and len(vector):
+        # cumulative sums add in the same order as the loops here
+        if running:
+            return chain.from_iterable(
+                (totals / numpy.arange(i + 1, i + len(totals) + 1)).tolist()
+                for i, totals in _xtotals(vector)
+            )
+        for _, totals in _xtotals(vector):
+            pass
+        return truediv(totals[-1].item(), len(vector))
+    if running:
+        return averager(iter(iterable))
+    # single pass with running total and count for constant memory
+    total = 0.0
+    length = 0
+    for length, item in enumerate(iterable, 1):
+        total += item
+    return truediv(total, length)
 
 
-def xcount(iterable):
+def xcount(iterable, k=None):
     '''
     Discover how common each item in `iterable` is and the overall count of each
     item in `iterable`.
 
     :argument iterable: iterable object
+    :keyword int k: track only the `k` most common items in bounded memory
+      (see :class:`HeavyHitters`)
 
     :return: Collects :func:`~collections.namedtuple` ``Count(least=int,
       most=int, overall=[(thing1, int), (thing2, int), ...])``
@@ -52,46 +1085,139 @@ def xcount(iterable):
     >>> # total count for every thing
     >>> common.overall
     [(11, 3), (3, 2), (5, 2), (7, 1)]
+    >>> # track only the two most common things
+    >>> xcount([11, 3, 11, 5, 11, 7, 11, 3], k=2).most
+    11
     '''
-    cnt = Counter(iterable).most_common
-    commonality = cnt()
-    return Count(
-        # least common
-        commonality[:-2:-1][0][0],
-        # most common (mode)
-        cnt(1)[0][0],
-        # overall commonality
-        commonality,
-    )
+    vector = _xarray(iterable)
+    if vector is not None:
+        if k is None and len(vector) and vector.dtype.kind in 'iu':
+            low = vector.min().item()
+            span = vector.max().item() - low + 1
+            if span <= 2 * len(vector) + 1024:
+                # tally integers in a narrow range by offset from the smallest
+                wide = 'u8' if vector.dtype.kind == 'u' else 'i8'
+                offsets = numpy.subtract(
+                    vector, numpy.array(low, wide), dtype=wide,
+                ).astype('intp')
+                counts = numpy.bincount(offsets, minlength=span)
+                firsts = numpy.full(span, len(vector))
+                numpy.minimum.at(firsts, offsets, numpy.arange(len(vector)))
+                seen = numpy.flatnonzero(counts)
+                # most common first and ties in order of first appearance
+                seen = seen[numpy.lexsort((firsts[seen], -counts[seen]))]
+                commonality = list(zip(
+                    [i + low for i in seen.tolist()], counts[seen].tolist(),
+                ))
+                return Count(
+                    commonality[-1][0], commonality[0][0], commonality,
+                )
+        iterable = _xitems(vector)
+    if k is not None:
+        return HeavyHitters(k).extend(iterable).result()
+    return _xcommon(Counter(iterable))
 
 
-def xmedian(iterable):
+def xmedian(iterable, running=False, buffer=None):
     '''
     Discover median value of numbers in `iterable`.
 
     :argument iterable: iterable object
-    :return: a number
+    :keyword bool running: return an :term:`iterator` of the median of every
+      item seen so far after each item in `iterable`
+    :keyword int buffer: most numbers to hold in memory before sorting them on
+      disk instead (see :func:`~blade.xorder.xsort`)
+    :return: a number or, alternatively, :term:`iterator` of numbers
 
     >>> from blade.xmath import xmedian
     >>> xmedian([4, 5, 7, 2, 1])
     4
     >>> xmedian([4, 5, 7, 2, 1, 8])
     4.5
+    >>> # running median
+    >>> list(xmedian([4, 5, 7, 2, 1, 8], running=True))
+    [4, 4.5, 5, 4.5, 4, 4.5]
     '''
-    i1, i2 = tee(sorted(iterable))
-    result = truediv(count(i1) - 1, 2)
-    pint = int(result)
-    if result % 2 == 0:
-        return xslicer(i2, pint)
-    i3, i4 = tee(i2)
-    return truediv(xslicer(i3, pint) + xslicer(i4, pint + 1), 2)
+    def medianer(iterable, _n=next, _t=truediv, _push=heappush, _pop=heappop):
+        # max-heap (negated) of lower half and min-heap of upper half
+        lower = []
+        upper = []
+        try:
+            while 1:
+                item = _n(iterable)
+                if not lower or item <= -lower[0]:
+                    _push(lower, -item)
+                else:
+                    _push(upper, item)
+                if len(lower) > len(upper) + 1:
+                    _push(upper, -_pop(lower))
+                elif len(upper) > len(lower):
+                    _push(lower, -_pop(upper))
+                if len(lower) > len(upper):
+                    yield -lower[0]
+                else:
+                    yield _t(upper[0] - lower[0], 2)
+        except StopIteration:
+            pass
+    vector = _xarray(iterable)
+    if running:
+        if vector is not None:
+            iterable = _xitems(vector)
+        return medianer(iter(iterable))
+    if vector is not None and len(vector):
+        middle = len(vector) // 2
+        if len(vector) % 2:
+            return numpy.partition(vector, middle)[middle].item()
+        vector = numpy.partition(vector, (middle - 1, middle))
+        return truediv(vector[middle - 1].item() + vector[middle].item(), 2)
+    # selection never changes its input so sequences need not be copied
+    if issequence(iterable):
+        data = iterable
+    elif buffer is None:
+        data = list(iterable)
+    else:
+        iterable = iter(iterable)
+        data = list(islice(iterable, buffer + 1))
+        if len(data) > buffer:
+            # too many numbers to hold at once so sort them on disk instead,
+            # letting go of the numbers read so far as they are sorted
+            iterable = chain(data, iterable)
+            del data
+            length, ordered = _xsorted(iterable, buffer=buffer)
+            middle = islice(ordered, (length - 1) // 2, None)
+            median = next(middle)
+            if not length % 2:
+                median = truediv(median + next(middle), 2)
+            ordered.close()
+            return median
+    length = len(data)
+    if not length:
+        raise ValueError('xmedian() arg is an empty iterable')
+    if length % 2:
+        return _xselect(data, length // 2)[0]
+    return truediv(sum(_xselect(data, length // 2 - 1)), 2)
 
 
-def xminmax(iterable):
+def xkurtosis(iterable):
+    '''
+    Discover the excess kurtosis of numbers in `iterable` in one pass.
+
+    :argument iterable: iterable object
+    :return: a number
+
+    >>> from blade.xmath import xkurtosis
+    >>> xkurtosis([1, 2, 3, 10])
+    -0.7696000000000001
+    '''
+    return Moments().extend(iterable).kurtosis()
+
+
+def xminmax(iterable, key=None):
     '''
     Discover the minimum and maximum values among items in `iterable`.
 
     :argument iterable: iterable object
+    :keyword key: :term:`key function`
     :return:  :func:`~collections.namedtuple` ``MinMAx(min=value, max=value)``.
 
     >>> from blade.xmath import xminmax
@@ -100,26 +1226,141 @@ def xminmax(iterable):
     1
     >>> minmax.max
     4
+    >>> # with key function
+    >>> xminmax(['moe', 'larry', 'curly'], len)
+    MinMax(min='moe', max='larry')
     '''
-    i1, i2 = tee(iterable)
-    return MinMax(min(i1), max(i2))
+    return MinMax(*_xminmax(iterable, key)[1::2])
+
 
+def xbottomk(iterable, k, key=None):
+    '''
+    Discover the `k` smallest items in `iterable` in one pass with a heap
+    holding at most `k` items.
+
+    :argument iterable: iterable object
+    :argument int k: number of items
+    :keyword key: :term:`key function`
+    :return: :term:`iterator` of items from the smallest up
+
+    >>> from blade.xmath import xbottomk
+    >>> list(xbottomk([10, 5, 100, 2, 1000], 2))
+    [2, 5]
+    >>> # with key function
+    >>> list(xbottomk(['moe', 'larry', 'curly', 'shemp'], 2, len))
+    ['moe', 'larry']
+    '''
+    return iter(_xrank(iterable, k, key, False))
+
+
+def xtopk(iterable, k, key=None):
+    '''
+    Discover the `k` largest items in `iterable` in one pass with a heap
+    holding at most `k` items.
+
+    :argument iterable: iterable object
+    :argument int k: number of items
+    :keyword key: :term:`key function`
+    :return: :term:`iterator` of items from the largest down
+
+    >>> from blade.xmath import xtopk
+    >>> list(xtopk([10, 5, 100, 2, 1000], 2))
+    [1000, 100]
+    >>> # with key function
+    >>> list(xtopk(['moe', 'larry', 'curly', 'shemp'], 2, len))
+    ['larry', 'curly']
+    '''
+    return iter(_xrank(iterable, k, key, True))
+
+
+def xfrequency(iterable, epsilon=0.001, delta=0.01, seed=0):
+    '''
+    Sketch how often each item in `iterable` occurs in one pass and fixed
+    memory.
+
+    :argument iterable: iterable object
+    :keyword float epsilon: error as a fraction of the number of items in
+      `iterable`
+    :keyword float delta: probability the error is exceeded
+    :keyword int seed: hash seed
+    :return: :class:`CountMin` sketch
 
-def xinterval(iterable):
+    >>> from blade.xmath import xfrequency
+    >>> xfrequency([11, 3, 5, 11, 7, 3, 5, 11]).estimate(3)
+    2
+    '''
+    return CountMin(epsilon, delta, seed).extend(iterable)
+
+
+def xinterval(iterable, key=None):
     '''
     Discover the length of the smallest interval that can contain the value of
     every items in `iterable`.
 
     :argument iterable: iterable object
+    :keyword key: :term:`key function` deriving each item's value
 
     :return: a number
 
     >>> from blade.xmath import xinterval
     >>> xinterval([3, 5, 7, 3, 11])
     8
+    >>> # with key function
+    >>> xinterval(['moe', 'larry', 'curly'], len)
+    2
+    '''
+    low, _, high, _ = _xminmax(iterable, key)
+    return high - low
+
+
+def xquantiles(
+    iterable, quantiles=(.5, .9, .99, .999), accuracy=.01, seed=None,
+):
+    '''
+    Estimate the values of numbers in `iterable` found at each quantile in
+    `quantiles` in one pass and bounded memory.
+
+    :argument iterable: iterable object
+    :keyword quantiles: iterable of quantiles between ``0.0`` and ``1.0``
+    :keyword float accuracy: target rank error as a fraction of the number of
+      items in `iterable`
+    :keyword seed: seed for the random number generator
+    :return: :func:`list` of numbers
+
+    >>> from blade.xmath import xquantiles
+    >>> xquantiles(range(1, 101), (.5, .9, .99))
+    [50, 90, 99]
+    '''
+    return QuantileSketch(accuracy, seed).extend(iterable).quantiles(quantiles)
+
+
+def xskew(iterable):
+    '''
+    Discover the skewness of numbers in `iterable` in one pass.
+
+    :argument iterable: iterable object
+    :return: a number
+
+    >>> from blade.xmath import xskew
+    >>> xskew([1, 2, 3, 10])
+    1.0182337649086284
+    '''
+    return Moments().extend(iterable).skew()
+
+
+def xstddev(iterable, population=False):
+    '''
+    Discover the standard deviation of numbers in `iterable` in one pass.
+
+    :argument iterable: iterable object
+    :keyword bool population: population rather than sample deviation
+    :return: a number
+
+    >>> from blade.xmath import xstddev
+    >>> xstddev([4, 8, 12])
+    4.0
     '''
-    i1, i2 = tee(sorted(iterable))
-    return deque(i1, maxlen=1).pop() - next(i2)
+    return Moments().extend(iterable).stddev(population)
 
 
 def xsum(iterable, start=0, precision=False):
@@ -142,4 +1383,32 @@ def xsum(iterable, start=0, precision=False):
     >>> xsum([.1, .1, .1, .1, .1, .1, .1, .1], precision=True)
     0.8
     '''
+    vector = _xarray(iterable)
+    if vector is not None:
+        if precision or vector.dtype.kind == 'f':
+            # Python floats add in the same order and precision as below
+            iterable = _xitems(vector)
+        elif len(vector):
+            # sum natively unless a fixed-width total could overflow
+            bound = max(abs(int(vector.min())), abs(int(vector.max())))
+            if bound * len(vector) < 2 ** 62:
+                return start + int(vector.sum(dtype='int64'))
+            iterable = _xitems(vector)
     return fsum(iterable) if precision else sum(iterable, start)
+
+
+def xvariance(iterable, population=False):
+    '''
+    Discover the variance of numbers in `iterable` in one pass.
+
+    :argument iterable: iterable object
+    :keyword bool population: population rather than sample variance
+    :return: a number
+
+    >>> from blade.xmath import xvariance
+    >>> xvariance([1, 2, 3, 4, 5])
+    2.5
+    >>> xvariance([1, 2, 3, 4, 5], population=True)
+    2.0
+    '''
+    return Moments().extend(iterable).variance(population)
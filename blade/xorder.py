@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+''':class:`blade` ordering operations'''
+
+from heapq import heapify, heappop, heapreplace
+from itertools import islice
+from tempfile import TemporaryFile
+
+from stuf.base import identity
+from stuf.six import pickle, range
+
+# most items pickled together when spilling a sorted run to disk
+_XBATCH = 4096
+# most sorted runs merged at once
+_XFANIN = 64
+
+
+class _xreversed(object):
+
+    '''Key that orders in reverse while still telling ties apart.'''
+
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+
+def _xspill(spill, items, batch):
+    '''
+    Pickle sorted `items` to the end of `spill` in batches of `batch` items.
+
+    :return: offsets the run starts and stops at in `spill`
+    '''
+    spill.seek(0, 2)
+    start = spill.tell()
+    dump = pickle.dump
+    items = iter(items)
+    while 1:
+        chunk = list(islice(items, batch))
+        if not chunk:
+            return start, spill.tell()
+        dump(chunk, spill, pickle.HIGHEST_PROTOCOL)
+
+
+def _xunspill(spill, start, stop):
+    '''Yield the items of the run spilled to `spill` from `start` to `stop`.'''
+    load = pickle.load
+    while start < stop:
+        # runs share one file so each reader keeps its own place in it
+        spill.seek(start)
+        chunk = load(spill)
+        start = spill.tell()
+        for item in chunk:
+            yield item
+
+
+def _xmerge(runs, key, reverse):
+    '''
+    Merge sorted `runs` into one ordering, taking ties from earlier runs first
+    so the merge is stable.
+    '''
+    decorate = (lambda x: _xreversed(key(x))) if reverse else key
+    heap = []
+    for index, run in enumerate(runs):
+        for item in run:
+            # the run index is unique so neither items nor runs get compared
+            heap.append([decorate(item), index, item, run])
+            break
+    heapify(heap)
+    while heap:
+        entry = heap[0]
+        yield entry[2]
+        for item in entry[3]:
+            entry[0], entry[2] = decorate(item), item
+            heapreplace(heap, entry)
+            break
+        else:
+            heappop(heap)
+
+
+def _xsorted(iterable, key=None, reverse=False, buffer=None):
+    '''
+    Sort `iterable`, spilling sorted runs of `buffer` items to disk when it
+    holds more than `buffer` items.
+
+    :return: number of items and :term:`iterator` of sorted items
+    '''
+    if buffer is None:
+        ordered = sorted(iterable, key=key, reverse=reverse)
+        return len(ordered), iter(ordered)
+    if buffer < 1:
+        raise ValueError('buffer must hold at least one item')
+    iterable = iter(iterable)
+    # merging reads one batch from each run, so the merge fits the buffer
+    batch = min(max(buffer // _XFANIN, 1), _XBATCH)
+    merge = identity if key is None else key
+    spill = None
+    runs = []
+    length = 0
+    while 1:
+        run = list(islice(iterable, buffer))
+        length += len(run)
+        run.sort(key=key, reverse=reverse)
+        if not runs and len(run) < buffer:
+            # everything fit in memory
+            return length, iter(run)
+        if not run:
+            break
+        if spill is None:
+            spill = TemporaryFile()
+        runs.append(_xspill(spill, run, batch))
+    # merge in passes of at most _XFANIN runs, each into one new file
+    while len(runs) > _XFANIN:
+        merged = TemporaryFile()
+        runs = [_xspill(merged, _xmerge(
+            [_xunspill(spill, *run) for run in runs[i:i + _XFANIN]],
+            merge, reverse,
+        ), batch) for i in range(0, len(runs), _XFANIN)]
+        spill.close()
+        spill = merged
+    return length, _xmerged(spill, runs, merge, reverse)
+
+
+def _xmerged(spill, runs, key, reverse):
+    '''Merge the sorted `runs` spilled to `spill`, closing it once done.'''
+    try:
+        for item in _xmerge(
+            [_xunspill(spill, *run) for run in runs], key, reverse,
+        ):
+            yield item
+    finally:
+        spill.close()
+
+
+def xsort(iterable, key=None, reverse=False, buffer=None):
+    '''
+    Sort items in `iterable`, holding at most `buffer` items in memory at once
+    by spilling sorted runs to a temporary file and merging them.
+
+    :argument iterable: :term:`iterable`
+    :keyword key: :term:`key function`
+    :keyword bool reverse: sort from largest to smallest
+    :keyword int buffer: most items to sort in memory (default is to sort
+      everything in memory)
+    :return: :term:`iterator` of sorted items
+
+    The sort is stable like :func:`sorted`. Items must be picklable once
+    `iterable` holds more than `buffer` items.
+
+    >>> from blade.xorder import xsort
+    >>> list(xsort([5, 3, 4, 1, 2], buffer=2))
+    [1, 2, 3, 4, 5]
+    >>> # with key function
+    >>> list(xsort(['moe', 'larry', 'curly', 'bob'], len, buffer=2))
+    ['moe', 'bob', 'larry', 'curly']
+    >>> list(xsort(['moe', 'larry', 'curly', 'bob'], len, True, buffer=2))
+    ['larry', 'curly', 'moe', 'bob']
+    '''
+    return _xsorted(iterable, key, reverse, buffer)[1]
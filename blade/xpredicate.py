@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+''':class:`blade` predicate expressions'''
+
+from re import compile as rcompile
+from keyword import iskeyword
+from operator import eq, ge, gt, le, lt, ne
+
+from ._xcompat import numpy
+from .xindex import BloomIndex, SortedIndex
+
+_XCOMPARE = {'==': eq, '!=': ne, '<': lt, '<=': le, '>': gt, '>=': ge}
+_XNAME = rcompile(r'^[A-Za-z_][A-Za-z0-9_]*$').match
+
+
+def _xexpression(value):
+    '''Wrap `value` as an :class:`Expression` unless it already is one.'''
+    return value if isinstance(value, Expression) else Expression(
+        'value', value,
+    )
+
+
+def _xconstant(value, constants, name=None):
+    '''
+    Refer to literal `value` as a name bound to it in `constants` or,
+    alternatively, show it with `name`.
+    '''
+    if name is not None:
+        return name(value)
+    constants.append(value)
+    return '_k%d' % (len(constants) - 1)
+
+
+def _xmembership(values):
+    '''Freeze `values` for fast membership tests.'''
+    if isinstance(values, (SortedIndex, BloomIndex)):
+        return values
+    try:
+        return frozenset(values)
+    except TypeError:
+        # unhashable values
+        return tuple(values)
+
+
+class Expression(object):
+
+    '''
+    Expression over a field of each item that comparisons, ``&`` (and),
+    ``|`` (or), ``~`` (not), :meth:`isin`, and :meth:`startswith` build into a
+    predicate usable as a test for :func:`~blade.xfilter.xfilter`,
+    :func:`~blade.xfilter.xtruefalse`, or :func:`~blade.xfilter.xmembers`.
+
+    Build expressions with :func:`xfield`. Predicates compile into one
+    :func:`callable` for testing items one at a time and evaluate as a NumPy
+    boolean mask over columns with :meth:`mask`.
+    '''
+
+    __slots__ = ('_kind', '_args', '_compiled')
+
+    def __init__(self, kind, *args):
+        self._kind = kind
+        self._args = args
+        self._compiled = None
+
+    def __bool__(self):
+        raise TypeError(
+            'combine expressions with &, | and ~ instead of and, or and not'
+        )
+
+    __nonzero__ = __bool__
+
+    def __call__(self, item):
+        return self.compile()(item)
+
+    def __repr__(self):
+        return 'Expression(%s)' % self._source([], repr)
+
+    def _compare(self, kind, other):
+        return Expression(kind, self, _xexpression(other))
+
+    def __eq__(self, other):
+        return self._compare('==', other)
+
+    # comparisons build expressions so expressions cannot be hashed
+    __hash__ = None
+
+    def __ne__(self, other):
+        return self._compare('!=', other)
+
+    def __lt__(self, other):
+        return self._compare('<', other)
+
+    def __le__(self, other):
+        return self._compare('<=', other)
+
+    def __gt__(self, other):
+        return self._compare('>', other)
+
+    def __ge__(self, other):
+        return self._compare('>=', other)
+
+    def __and__(self, other):
+        return Expression('and', self, _xexpression(other))
+
+    def __rand__(self, other):
+        return Expression('and', _xexpression(other), self)
+
+    def __or__(self, other):
+        return Expression('or', self, _xexpression(other))
+
+    def __ror__(self, other):
+        return Expression('or', _xexpression(other), self)
+
+    def __invert__(self):
+        return Expression('not', self)
+
+    def _source(self, constants, name=None):
+        '''
+        Render this expression as Python source over item ``_i``, collecting
+        literal values in `constants` or, alternatively, showing them with
+        `name`.
+        '''
+        kind, args = self._kind, self._args
+        if kind == 'value':
+            return _xconstant(args[0], constants, name)
+        if kind == 'field':
+            key, attribute = args
+            if key is None:
+                return '_i'
+            if not attribute:
+                return '_i[%s]' % _xconstant(key, constants, name)
+            if _XNAME(key) and not iskeyword(key):
+                return '_i.%s' % key
+            return 'getattr(_i, %s)' % _xconstant(key, constants, name)
+        if kind == 'not':
+            return '(not %s)' % args[0]._source(constants, name)
+        left = args[0]._source(constants, name)
+        right = args[1]._source(constants, name)
+        if kind == 'startswith':
+            return '%s.startswith(%s)' % (left, right)
+        return '(%s %s %s)' % (left, kind, right)
+
+    def compile(self):
+        '''
+        Compile this expression into a single :func:`callable` taking an item.
+
+        :return: :func:`callable`
+        '''
+        if self._compiled is None:
+            constants = []
+            source = self._source(constants)
+            names = ', '.join('_k%d' % i for i in range(len(constants)))
+            # close over literals so they load as fast as local names
+            self._compiled = eval(
+                'lambda %s: lambda _i: %s' % (names, source), {},
+            )(*constants)
+        return self._compiled
+
+    def isin(self, values):
+        '''
+        Test if this expression's value is one of `values`.
+
+        :argument values: :term:`iterable` of values or membership index from
+          :mod:`blade.xindex`
+        :return: :class:`Expression`
+        '''
+        return Expression('in', self, _xexpression(_xmembership(values)))
+
+    def mask(self, data):
+        '''
+        Evaluate this expression over every item in `data` at once.
+
+        :argument data: NumPy array, structured NumPy array, or
+          :term:`mapping` of field names to columns
+        :return: NumPy boolean array
+        '''
+        if numpy is None:
+            raise ImportError('mask() needs NumPy')
+        return numpy.asarray(self._mask(data), dtype=bool)
+
+    def _mask(self, data):
+        kind, args = self._kind, self._args
+        if kind == 'value':
+            return args[0]
+        if kind == 'field':
+            key, attribute = args
+            if key is None:
+                return numpy.asarray(data)
+            if attribute and not isinstance(data, numpy.ndarray):
+                return numpy.asarray(getattr(data, key))
+            # record fields are columns whether looked up as items or not
+            return numpy.asarray(data[key])
+        if kind == 'not':
+            return numpy.logical_not(args[0]._mask(data))
+        left = args[0]._mask(data)
+        right = args[1]._mask(data)
+        if kind == 'and':
+            return numpy.logical_and(left, right)
+        if kind == 'or':
+            return numpy.logical_or(left, right)
+        if kind == 'in':
+            if isinstance(right, (SortedIndex, BloomIndex)):
+                return right.mask(left)
+            return numpy.isin(left, list(right))
+        if kind == 'startswith':
+            return numpy.char.startswith(left.astype(str), right)
+        return _XCOMPARE[kind](left, right)
+
+    def _maskable(self, dtype):
+        '''
+        Tell if every field this expression refers to is a field of NumPy
+        `dtype`.
+        '''
+        kind, args = self._kind, self._args
+        if kind == 'value':
+            return True
+        if kind == 'field':
+            return args[0] is None or args[0] in (dtype.names or ())
+        return all(arg._maskable(dtype) for arg in args)
+
+    def startswith(self, prefix):
+        '''
+        Test if this expression's string value starts with `prefix`.
+
+        :argument str prefix: prefix
+        :return: :class:`Expression`
+        '''
+        return Expression('startswith', self, _xexpression(prefix))
+
+
+def xfield(name=None, attribute=False):
+    '''
+    Refer to the field `name` of each item in a predicate :class:`Expression`.
+
+    :keyword name: key, index or, alternatively, attribute name (default is
+      the whole item)
+    :keyword bool attribute: look `name` up as an attribute rather than an
+      item
+    :return: :class:`Expression`
+
+    >>> from blade.xpredicate import xfield
+    >>> from blade.xfilter import xfilter
+    >>> stooges = [
+    ...    dict(name='moe', age=40),
+    ...    dict(name='larry', age=50),
+    ...    dict(name='curly', age=60),
+    ... ]
+    >>> test = (xfield('age') > 45) & ~xfield('name').isin(['curly'])
+    >>> [stooge['name'] for stooge in xfilter(stooges, test)]
+    ['larry']
+    >>> # the whole item
+    >>> list(xfilter([1, 2, 3, 4, 5, 6], xfield() >= 4))
+    [4, 5, 6]
+    '''
+    return Expression('field', name, attribute)
@@ -1,18 +1,332 @@
 # -*- coding: utf-8 -*-
 ''':class:`blade` slicing operations'''
 
-from random import randrange
-from collections import deque
+from array import array
+from math import ceil, exp, log
+from operator import getitem
+from heapq import heappush, heapreplace
+from random import Random
+from collections import deque, namedtuple
 from functools import partial
-from itertools import islice, tee
+from itertools import chain, count as counter, islice
 
-from stuf.six import next
+from stuf.base import first, issequence
+from stuf.six import map as xmap, next, range, zip
 from stuf.six.moves import zip_longest  # @UnresolvedImport
-from stuf.iterable import deferfunc, deferiter, count, partmap
+from stuf.iterable import deferfunc, deferiter
+
+from ._xcompat import memoryview, numpy
+from .xmath import Accumulator
+
+# binary buffers sliced without copying (bytes is text on Python 2)
+_XBUFFERS = (bytearray, array) + (
+    () if memoryview is None else (memoryview,)
+) + (() if bytes is str else (bytes,))
+
+# sequences known to support slicing
+_XSLICEABLE = list, tuple, array, bytearray, bytes, type('')
+
+Window = namedtuple('Window', 'start stop value')
 
 xslicer = partial(lambda n, i, x, y: n(i(x, y, None)), next, islice)
 
 
+class Reservoir(Accumulator):
+
+    '''
+    Mergeable random sample of `size` items, uniform or weighted.
+
+    Every item gets a random key ``log(u) / weight`` and the sample keeps the
+    items with the largest keys (`A-Res <http://dx.doi.org/10.1016/
+    j.ipl.2005.11.003>`_), so samples drawn from separate shards merge into a
+    sample of every shard. :meth:`extend` jumps over items that would not
+    enter the sample (A-ExpJ).
+
+    :argument int size: sample size
+    :keyword weight: :func:`callable` returning the weight of an item
+    :keyword seed: seed for a new random number generator
+    :keyword random: :class:`random.Random` instance to draw from
+
+    >>> from blade.xslice import Reservoir
+    >>> sample = Reservoir(3, seed=1).extend(range(100))
+    >>> merged = sample.merge(Reservoir(3, seed=2).extend(range(100, 200)))
+    >>> len(merged.result()), merged.count
+    (3, 200)
+    '''
+
+    __slots__ = ('size', 'weight', 'count', '_heap', '_random', '_order')
+
+    def __init__(self, size, weight=None, seed=None, random=None):
+        self.size = size
+        self.weight = weight
+        # number of items seen
+        self.count = 0
+        # min-heap of (key, order, item) holding the sample
+        self._heap = []
+        self._random = _xrandom(seed, random)
+        # breaks ties between keys without comparing items
+        self._order = 0
+
+    def _add(self, item):
+        weight = 1.0 if self.weight is None else self.weight(item)
+        if weight > 0:
+            self._offer(log(_xuniform(self._random.random)) / weight, item)
+
+    def _offer(self, key, item):
+        heap = self._heap
+        self._order += 1
+        entry = key, self._order, item
+        if len(heap) < self.size:
+            heappush(heap, entry)
+        elif key > heap[0][0]:
+            heapreplace(heap, entry)
+
+    def extend(self, iterable):
+        # tally every item pulled, including those jumped over
+        tally = counter()
+        iterable = xmap(first, zip(iterable, tally))
+        try:
+            self._extend(iterable)
+        finally:
+            self.count += next(tally)
+        return self
+
+    def _extend(self, iterable):
+        heap = self._heap
+        uniform = partial(_xuniform, self._random.random)
+        weight = self.weight
+        while len(heap) < self.size:
+            for item in iterable:
+                self._add(item)
+                break
+            else:
+                return
+        if not self.size:
+            # nothing to sample but every item still counts
+            deque(iterable, maxlen=0)
+            return
+        while 1:
+            # total weight to jump over before the next item enters
+            threshold = heap[0][0]
+            jump = log(uniform()) / threshold
+            if weight is None:
+                this = 1.0
+                skip = max(int(ceil(jump)) - 1, 0)
+                for item in islice(iterable, skip, None):
+                    break
+                else:
+                    return
+            else:
+                for item in iterable:
+                    this = weight(item)
+                    if this > 0:
+                        jump -= this
+                        if jump <= 0:
+                            break
+                else:
+                    return
+            # key drawn above the threshold the item just cleared
+            floor = exp(threshold * this)
+            self._offer(log(floor + (1.0 - floor) * uniform()) / this, item)
+
+    def merge(self, other):
+        for key, _, item in other._heap:
+            self._offer(key, item)
+        self.count += other.count
+        return self
+
+    def result(self):
+        '''Sampled items, most heavily favored first.'''
+        return [item for _, _, item in sorted(self._heap, reverse=True)]
+
+    def update(self, item):
+        self.count += 1
+        self._add(item)
+        return self
+
+
+def _xrandom(seed=None, random=None):
+    '''Pick random number generator `random` or make one from `seed`.'''
+    return Random(seed) if random is None else random
+
+
+def _xsequence(iterable):
+    '''Tell if `iterable` has a length and constant-time indexing.'''
+    return issequence(iterable) or isinstance(iterable, array)
+
+
+def _xuniform(random):
+    '''Draw from `random` strictly between 0 and 1 to keep logs finite.'''
+    number = 0.0
+    while not number:
+        number = random()
+    return number
+
+
+def _xbuffer(iterable):
+    '''
+    View `iterable` as a one-dimensional NumPy array if it is one or as a
+    one-dimensional :class:`memoryview` if it is a binary buffer.
+    '''
+    if numpy is not None and isinstance(iterable, numpy.ndarray):
+        return iterable if iterable.ndim == 1 else None
+    if memoryview is None or not isinstance(iterable, _XBUFFERS):
+        return None
+    try:
+        view = memoryview(iterable)
+    except TypeError:
+        return None
+    return view if view.ndim == 1 else None
+
+
+def _xchunks(view, n, pad):
+    '''Yield `n`-item slices of `view`, passing only the last one to `pad`.'''
+    whole = len(view) - len(view) % n
+    for start in range(0, whole, n):
+        yield view[start:start + n]
+    if whole < len(view):
+        yield pad(view[whole:])
+
+
+def _xholds(view, fill):
+    '''Tell if the buffer `view` can hold `fill` as one of its items.'''
+    if numpy is not None and isinstance(view, numpy.ndarray):
+        return numpy.can_cast(numpy.min_scalar_type(fill), view.dtype)
+    try:
+        array(view.format, [fill])
+    except (TypeError, ValueError, OverflowError):
+        return False
+    return True
+
+
+def _xpad(view, n, fill):
+    '''Copy the short `view` into a new buffer padded out with `fill`.'''
+    if fill is None:
+        return view
+    padding = n - len(view)
+    if numpy is not None and isinstance(view, numpy.ndarray):
+        return numpy.concatenate(
+            (view, numpy.full(padding, fill, dtype=view.dtype))
+        )
+    return memoryview(array(view.format, view.tolist() + [fill] * padding))
+
+
+def _xlag(iterable):
+    '''Yield the items in `iterable` one step behind, holding the last back.'''
+    iterable = iter(iterable)
+    for previous in iterable:
+        for item in iterable:
+            yield previous
+            previous = item
+
+
+def _xtail(iterable, n):
+    '''Yield the last `n` items in `iterable`, holding at most `n` at once.'''
+    for item in deque(iterable, maxlen=n):
+        yield item
+
+
+def _xwindow(iterable, size, step, accumulator):
+    '''Yield every `step`th full window of `iterable` from a ring buffer.'''
+    window = deque(maxlen=size)
+    append = window.append
+    aggregate = None if accumulator is None else accumulator()
+    # accumulators that cannot discard are refilled for every window
+    discard = getattr(aggregate, 'discard', None)
+    due = size
+    for item in iterable:
+        if discard is not None:
+            if len(window) == size:
+                discard(window[0])
+            aggregate.update(item)
+        append(item)
+        due -= 1
+        if not due:
+            due = step
+            if accumulator is None:
+                yield tuple(window)
+            elif discard is None:
+                yield accumulator().extend(window).result()
+            else:
+                yield aggregate.result()
+
+
+def _xtimewindow(iterable, size, timestamp, step, accumulator):
+    '''Yield every non-empty window of `iterable` spanning `size` time.'''
+    window = deque()
+    popleft = window.popleft
+    incremental = accumulator is not None
+    aggregate = discard = start = last = None
+    end = object()
+    for item in chain(iterable, (end,)):
+        closing = item is end
+        if not closing:
+            time = timestamp(item)
+            if last is not None and time < last:
+                raise ValueError('xtimewindow() timestamps must not decrease')
+            last = time
+        # close every window that ends at or before this item
+        while window and (closing or time >= start + size):
+            yield _xclose(window, start, size, accumulator, aggregate)
+            start += step
+            while window and window[0][0] < start:
+                if discard is not None:
+                    discard(window[0][1])
+                popleft()
+        if closing:
+            break
+        if not window:
+            # jump to the first window holding this item
+            start = ((time - size) // step + 1) * step
+            if time < start:
+                # the item falls in the gap between two hopping windows
+                continue
+            if incremental:
+                aggregate = accumulator()
+                discard = getattr(aggregate, 'discard', None)
+                if discard is None:
+                    # accumulators that cannot discard are refilled instead
+                    aggregate = None
+                    incremental = False
+        window.append((time, item))
+        if aggregate is not None:
+            aggregate.update(item)
+
+
+def _xclose(window, start, size, accumulator, aggregate):
+    '''Close the time window of items in `window` starting at `start`.'''
+    if accumulator is None:
+        value = tuple(item for _, item in window)
+    elif aggregate is None:
+        value = accumulator().extend(item for _, item in window).result()
+    else:
+        value = aggregate.result()
+    return Window(start, start + size, value)
+
+
+def _xreservoir(iterable, n, rand):
+    '''
+    Sample `n` items from `iterable` in one pass with `Algorithm L
+    <http://dl.acm.org/citation.cfm?id=198435>`_, jumping straight over items
+    that would not enter the sample.
+    '''
+    uniform = partial(_xuniform, rand.random)
+    iterable = iter(iterable)
+    reservoir = list(islice(iterable, n))
+    if len(reservoir) < n or not n:
+        return reservoir
+    weight = exp(log(uniform()) / n)
+    while 1:
+        for item in islice(
+            iterable, int(log(uniform()) / log(1.0 - weight)), None,
+        ):
+            reservoir[rand.randrange(n)] = item
+            break
+        else:
+            return reservoir
+        weight *= exp(log(uniform()) / n)
+
+
 def xat(iterable, n, default=None):
     '''
     :term:`Slice` off items in `iterable` found at index `n`.
@@ -30,21 +344,37 @@ def xat(iterable, n, default=None):
     >>> xat([5, 4, 3, 2, 1], 10, 11)
     11
     '''
+    if n >= 0 and _xsequence(iterable):
+        try:
+            return iterable[n]
+        except IndexError:
+            return default
     return next(islice(iterable, n, None), default)
 
 
-def xchoice(iterable):
+def xchoice(iterable, seed=None, random=None):
     '''
     Randomly :term:`slice` off **one** items in `iterable`.
 
     :argument iterable: :term:`iterable`
+    :keyword seed: seed for a new random number generator
+    :keyword random: :class:`random.Random` instance to draw from
 
     >>> from blade.xslice import xchoice
-    >>> list(xchoice([1, 2, 3, 4, 5, 6])) # doctest: +SKIP
+    >>> xchoice([1, 2, 3, 4, 5, 6]) # doctest: +SKIP
     3
+    >>> # reproducible choice
+    >>> xchoice([1, 2, 3, 4, 5, 6], seed=1) == xchoice(range(1, 7), seed=1)
+    True
     '''
-    i1, i2 = tee(iterable)
-    return xat(i1, randrange(0, count(i2)))
+    rand = _xrandom(seed, random)
+    if _xsequence(iterable):
+        if len(iterable):
+            return iterable[rand.randrange(len(iterable))]
+    else:
+        for item in _xreservoir(iterable, 1, rand):
+            return item
+    raise ValueError('xchoice() arg is an empty iterable')
 
 
 def xdice(iterable, n, fill=None):
@@ -57,10 +387,24 @@ def xdice(iterable, n, fill=None):
     :keyword fill: value to pad out incomplete iterables
     :return: :term:`iterator` of items
 
+    Objects supporting the buffer protocol (:func:`bytes`, :func:`bytearray`,
+    :class:`memoryview`, :class:`array.array`) are sliced into
+    :class:`memoryview` slices and NumPy arrays into array views without
+    copying. Only a short last slice is copied when padding it out with
+    `fill` and it is left short if `fill` is :const:`None`. Buffers that
+    cannot hold `fill` are sliced into tuples like other iterables.
+
     >>> from blade.xslice import xdice
     >>> list(xdice(['moe', 'larry', 'curly', 30, 40, 50, True], 2, 'x'))
     [('moe', 'larry'), ('curly', 30), (40, 50), (True, 'x')]
+    >>> [bytes(chunk) for chunk in xdice(b'moelarry', 3)]
+    [b'moe', b'lar', b'ry']
     '''
+    view = _xbuffer(iterable)
+    if view is not None and (
+        fill is None or not len(view) % n or _xholds(view, fill)
+    ):
+        return _xchunks(view, n, partial(_xpad, n=n, fill=fill))
     return zip_longest(fillvalue=fill, *[iter(iterable)] * n)
 
 
@@ -95,8 +439,9 @@ def xinitial(iterable):
     >>> list(xinitial([5, 4, 3, 2, 1]))
     [5, 4, 3, 2]
     '''
-    i1, i2 = tee(iterable)
-    return islice(i1, count(i2) - 1)
+    if _xsequence(iterable):
+        return islice(iterable, max(len(iterable) - 1, 0))
+    return _xlag(iterable)
 
 
 def xlast(iterable, n=0):
@@ -116,9 +461,14 @@ def xlast(iterable, n=0):
     >>> list(xlast([5, 4, 3, 2, 1], 2))
     [2, 1]
     '''
+    if _xsequence(iterable):
+        if n:
+            if isinstance(iterable, _XSLICEABLE):
+                return iter(iterable[-n:])
+            return islice(iterable, max(len(iterable) - n, 0), None)
+        return deferfunc(partial(getitem, iterable, -1))
     if n:
-        i1, i2 = tee(iterable)
-        return islice(i1, count(i2) - n, None)
+        return _xtail(iterable, n)
     return iter(deferfunc(deque(iterable, maxlen=1).pop))
 
 
@@ -136,23 +486,112 @@ def xrest(iterable):
     return islice(iterable, 1, None)
 
 
-def xsample(iterable, n):
+def xsample(iterable, n, seed=None, random=None, weight=None):
     '''
-    Randomly :term:`slice` off `n` items in `iterable`.
+    Randomly :term:`slice` off `n` items in `iterable` in one pass.
 
     :argument iterable: :term:`iterable`
     :argument int n: sample size
+    :keyword seed: seed for a new random number generator
+    :keyword random: :class:`random.Random` instance to draw from
+    :keyword weight: :func:`callable` returning the weight of an item, making
+      heavier items proportionally likelier to be sampled
     :return: :term:`iterator` of items
 
     >>> from blade.xslice import xsample
     >>> list(xsample([1, 2, 3, 4, 5, 6], 3)) # doctest: +SKIP
     [2, 4, 5]
+    >>> # reproducible sample
+    >>> sample = list(xsample(range(100), 3, seed=1))
+    >>> sample == list(xsample(range(100), 3, seed=1))
+    True
+    >>> # weighted sample
+    >>> list(xsample([1, 2, 3, 4, 5, 6], 2, weight=float)) # doctest: +SKIP
+    [6, 4]
+    '''
+    if weight is not None:
+        reservoir = Reservoir(n, weight, seed, random).extend(iterable)
+        return iter(reservoir.result())
+    rand = _xrandom(seed, random)
+    reservoir = _xreservoir(iterable, n, rand)
+    rand.shuffle(reservoir)
+    return iter(reservoir)
+
+
+def xtimewindow(iterable, size, timestamp, step=None, accumulator=None):
+    '''
+    :term:`Slice` items in `iterable` into windows spanning `size` units of
+    time, starting a new window every `step` units of time.
+
+    :argument iterable: :term:`iterable` of items in timestamp order
+    :argument size: units of time spanned by each window
+    :argument timestamp: function returning the time of an item as a number
+    :keyword step: units of time between the starts of windows (default is
+      `size` for tumbling windows)
+    :keyword accumulator: :class:`~blade.xmath.Accumulator` factory to fold
+      each window into instead of collecting its items
+    :return: :term:`iterator` of :func:`~collections.namedtuple`\s
+      ``Window(start=time, stop=time, value=items or result)``
+
+    Windows start at whole multiples of `step` and hold items timed from their
+    `start` up to but not including their `stop`. Windows without any items
+    are skipped. Accumulators that can
+    :attr:`~blade.xmath.Accumulator.discard` items are updated as items enter
+    and leave each window instead of being refilled for every window.
+
+    >>> from blade.xslice import xtimewindow
+    >>> identity = lambda x: x
+    >>> for window in xtimewindow([1, 2, 4, 5, 12], 5, identity):
+    ...     window
+    Window(start=0, stop=5, value=(1, 2, 4))
+    Window(start=5, stop=10, value=(5,))
+    Window(start=10, stop=15, value=(12,))
+    >>> # sliding windows
+    >>> from blade.xmath import Tally
+    >>> [w.value for w in xtimewindow([1, 2, 4, 5], 4, identity, 2, Tally)]
+    [1, 2, 3, 2]
+    '''
+    if step is None:
+        step = size
+    if size <= 0 or step <= 0:
+        raise ValueError('xtimewindow() size and step must be positive')
+    return _xtimewindow(iterable, size, timestamp, step, accumulator)
+
+
+def xwindow(iterable, size, step=1, accumulator=None):
+    '''
+    :term:`Slice` overlapping windows of `size` items out of `iterable`,
+    starting a new window every `step` items.
+
+    :argument iterable: :term:`iterable`
+    :argument int size: number of items in each window
+    :keyword int step: number of items between the starts of windows
+    :keyword accumulator: :class:`~blade.xmath.Accumulator` factory to fold
+      each window into instead of collecting its items
+    :return: :term:`iterator` of items or, alternatively, results
+
+    Only full windows are yielded. Objects supporting the buffer protocol yield
+    :class:`memoryview` slices and NumPy arrays yield array views without
+    copying. Accumulators that can :attr:`~blade.xmath.Accumulator.discard`
+    items are updated as items enter and leave the window instead of being
+    refilled for every window.
+
+    >>> from blade.xslice import xwindow
+    >>> list(xwindow([1, 2, 3, 4, 5], 3))
+    [(1, 2, 3), (2, 3, 4), (3, 4, 5)]
+    >>> list(xwindow([1, 2, 3, 4, 5], 2, 2))
+    [(1, 2), (3, 4)]
+    >>> # moving average
+    >>> from blade.xmath import Mean
+    >>> list(xwindow([1, 2, 3, 4, 5], 2, accumulator=Mean))
+    [1.5, 2.5, 3.5, 4.5]
     '''
-    i1, i2 = tee(iterable)
-    return partmap(
-        lambda i, r, c, x: i(x, r(0, c)),
-        tee(i2, n),
-        islice,
-        randrange,
-        count(i1),
-    )
+    if size < 1 or step < 1:
+        raise ValueError('xwindow() size and step must be at least 1')
+    if accumulator is None:
+        view = _xbuffer(iterable)
+        if view is not None:
+            return (
+                view[i:i + size] for i in range(0, len(view) - size + 1, step)
+            )
+    return _xwindow(iterable, size, step, accumulator)
@@ -3,6 +3,11 @@
 
 from stuf.six import unittest
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class stooges: #@IgnorePep8
     name = 'moe'
@@ -34,6 +39,40 @@ class stooge3(stoog2): #@IgnorePep8
 
 class TextXFilter(unittest.TestCase):
 
+    def test_xaggregate(self):
+        from blade.xfilter import xaggregate, xgroup
+        from blade.xmath import Extremes, Mean, Tally, Total
+        from operator import itemgetter
+        sales = [
+            ('moe', 10), ('larry', 20), ('moe', 30), ('curly', 5),
+            ('larry', 7), ('moe', 2),
+        ]
+        amount = itemgetter(1)
+        groups = list(xaggregate(
+            iter(sales), itemgetter(0), count=Tally, total=(Total, amount),
+            mean=(Mean, amount), minmax=(Extremes, amount),
+        ))
+        self.assertEqual([g.keys for g in groups], ['moe', 'larry', 'curly'])
+        self.assertEqual(groups[0].groups._fields, (
+            'count', 'mean', 'minmax', 'total',
+        ))
+        self.assertEqual(tuple(groups[0].groups), (3, 14.0, (2, 30), 42))
+        self.assertEqual(groups[1].groups.total, 27)
+        self.assertEqual(groups[2].groups.minmax, (5, 5))
+        # same totals as grouping then reducing each group
+        for aggregate, group in zip(
+            sorted(groups), xgroup(sales, itemgetter(0)),
+        ):
+            self.assertEqual(aggregate.keys, group.keys)
+            self.assertEqual(
+                aggregate.groups.total, sum(map(amount, group.groups)),
+            )
+        self.assertEqual(
+            list(xaggregate([1, 2, 3, 4], lambda x: x % 2, total=Total)),
+            [(1, (4,)), (0, (6,))],
+        )
+        self.assertEqual(list(xaggregate([], total=Total)), [])
+
     def test_xgroup(self,):
         from blade.xfilter import xgroup
         self.assertEqual(
@@ -45,6 +84,30 @@ class TextXFilter(unittest.TestCase):
             list(xgroup([1.3, 2.1, 2.4], floor)),
             [(1.0, (1.3,)), (2.0, (2.1, 2.4))]
         )
+        self.assertEqual(
+            list(xgroup([2.4, 1.3, 2.1], floor, hashed=True)),
+            [(2.0, (2.4, 2.1)), (1.0, (1.3,))]
+        )
+        # keys that hash but cannot be ordered
+        self.assertEqual(
+            list(xgroup([1, 'a', 2, 'b'], type, hashed=True)),
+            [(int, (1, 2)), (str, ('a', 'b'))]
+        )
+        self.assertEqual(list(xgroup([], hashed=True)), [])
+        self.assertEqual(
+            list(xgroup([1.3, 2.1, 2.4, 1.5], floor, presorted=True)),
+            [(1.0, (1.3,)), (2.0, (2.1, 2.4)), (1.0, (1.5,))]
+        )
+        from itertools import count, islice
+        self.assertEqual(
+            list(islice(xgroup(count(), lambda x: x // 2, presorted=True), 2)),
+            [(0, (0, 1)), (1, (2, 3))]
+        )
+        # sorting on disk beyond a buffer
+        data = [2.4, 1.3, 3.5, 2.1, 1.8, 3.1]
+        self.assertEqual(
+            list(xgroup(data, floor, buffer=2)), list(xgroup(data, floor)),
+        )
 
     def test_xtraverse(self):
         self.maxDiff = None
@@ -90,6 +153,44 @@ class TextXFilter(unittest.TestCase):
             )],
         )
 
+    def test_xtraverse_nesting(self):
+        from blade.xfilter import xtraverse
+        from stuf.collects import OrderedDict
+        test = lambda x: not x[0].startswith('__')
+        class outer(object):  # @IgnorePep8
+            tags = ['a', 'b']
+            class middle(object):  # @IgnorePep8
+                name = 'larry'
+                class inner(object):  # @IgnorePep8
+                    name = 'curly'
+        # cyclic references are left as classes instead of expanded forever
+        outer.middle.inner.back = outer
+        outer.me = outer
+        found = list(xtraverse([outer], test))[0]
+        self.assertEqual(found['tags'], ['a', 'b'])
+        self.assertIs(found['me'], outer)
+        self.assertEqual(found.maps[1], OrderedDict([
+            ('inner', OrderedDict([('back', outer), ('name', 'curly')])),
+            ('name', 'larry'), ('classname', 'middle'),
+        ]))
+        found = list(xtraverse([outer], test, max_depth=1))[0]
+        self.assertIs(found.maps[1]['inner'], outer.middle.inner)
+        found = list(xtraverse([outer], test, max_depth=0))[0]
+        self.assertEqual(len(found.maps), 1)
+        self.assertIs(found['middle'], outer.middle)
+        # deeper than the recursion limit
+        import sys
+        top = bottom = type('nest', (object,), {})
+        for _ in range(sys.getrecursionlimit() + 100):
+            nested = type('nest', (object,), {})
+            bottom.nest = nested
+            bottom = nested
+        bottom.name = 'moe'
+        found = list(xtraverse([top], test))[0]['nest']
+        while 'name' not in found:
+            found = found['nest']
+        self.assertEqual(found['name'], 'moe')
+
     def test_xattrs(self):
         from stuf import stuf
         from blade.xfilter import xattrs
@@ -107,6 +208,51 @@ class TextXFilter(unittest.TestCase):
         )
         self.assertEqual(list(xattrs(stooge, 'place')), [])
 
+    def test_xattrs_columnar(self):
+        from stuf import stuf
+        from blade.xfilter import xattrs
+        from blade.xmath import xaverage, xsum
+        records = [
+            stuf(name='moe', latency=.5, size=10, ok=True),
+            stuf(name='larry', latency=1.5, size=2 ** 70, ok=False),
+            stuf(name='curly', size=30, ok=True),
+            stuf(name='shemp', latency=2, size=40, ok=True),
+        ]
+        (names, latency, ok), = xattrs(
+            records, 'name', 'latency', 'ok', columnar=True,
+        )
+        self.assertEqual(names, ['moe', 'larry', 'shemp'])
+        self.assertEqual(latency.tolist(), [.5, 1.5, 2.0])
+        self.assertEqual(ok, [True, False, True])
+        self.assertEqual(xsum(latency), 4.0)
+        self.assertEqual(xaverage(latency), 4 / 3.0)
+        if numpy is None:
+            from array import array
+            self.assertIsInstance(latency, array)
+        else:
+            self.assertIsInstance(latency, numpy.ndarray)
+        batches = list(xattrs(records, 'size', columnar=True, batch=2))
+        # too big for a machine integer
+        self.assertEqual(batches[0], ([10, 2 ** 70],))
+        self.assertEqual(batches[1][0].tolist(), [30, 40])
+        self.assertEqual(list(xattrs([], 'size', columnar=True)), [])
+        self.assertEqual(
+            list(xattrs(records, 'size', columnar=False)),
+            [10, 2 ** 70, 30, 40],
+        )
+        self.assertRaises(TypeError, xattrs, records, 'size', column=True)
+
+    def test_xitems_columnar(self):
+        from blade.xfilter import xitems
+        rows = [[1, 2.5], [3, 4.5], [5], [7, 8.5]]
+        batches = [
+            tuple(column.tolist() for column in batch)
+            for batch in xitems(rows, 0, 1, columnar=True, batch=2)
+        ]
+        self.assertEqual(batches, [([1, 3], [2.5, 4.5]), ([7], [8.5])])
+        (ids,), = xitems(rows, 0, columnar=True)
+        self.assertEqual(ids.tolist(), [1, 3, 5, 7])
+
     def test_xitems(self):
         from blade.xfilter import xitems
         stooge = [
@@ -145,6 +291,75 @@ class TextXFilter(unittest.TestCase):
             (tuple(results.true), tuple(results.false)),
             ((2, 4, 6), (1, 3, 5))
         )
+        calls = []
+        def test(x):  # @IgnorePep8
+            calls.append(x)
+            return x % 2 == 0
+        results = xtruefalse(iter([1, 2, 3, 4, 5, 6]), test)
+        self.assertEqual(tuple(results.false), (1, 3, 5))
+        self.assertEqual(tuple(results.true), (2, 4, 6))
+        self.assertEqual(calls, [1, 2, 3, 4, 5, 6])
+        results = xtruefalse(range(10), lambda x: x < 8, buffer=4)
+        self.assertRaises(OverflowError, list, results.false)
+
+    def test_xpartition(self):
+        from blade.xfilter import xpartition
+        from itertools import count, islice
+        small, medium, large = xpartition(
+            [1, 20, 300, 2, 30, 4000], lambda x: len(str(x)), (1, 2, 3),
+        )
+        self.assertEqual(list(medium), [20, 30])
+        self.assertEqual(list(small), [1, 2])
+        self.assertEqual(list(large), [300])
+        # lazy and bounded on endless input
+        evens, odds = xpartition(count(), lambda x: x % 2, (0, 1), 1)
+        self.assertEqual(
+            list(islice(zip(evens, odds), 3)), [(0, 1), (2, 3), (4, 5)],
+        )
+        evens, odds = xpartition(count(), lambda x: x % 2, (0, 1), 2)
+        self.assertRaises(OverflowError, list, islice(evens, 10))
+        self.assertEqual([list(i) for i in xpartition([], bool)], [[], []])
+
+    def test_xinvalidate(self):
+        from blade.xfilter import xinvalidate, xmembers, xmro, xtraverse
+        import gc
+        import weakref
+        test = lambda x: not x[0].startswith('__')
+        class base(object):  # @IgnorePep8
+            name = 'moe'
+        class derived(base):  # @IgnorePep8
+            age = 40
+        self.assertEqual(
+            list(xmembers([derived], test)), [('age', 40), ('name', 'moe')],
+        )
+        self.assertEqual(list(xtraverse([derived], test))[0]['name'], 'moe')
+        # values are read afresh while names are cached
+        base.name = 'larry'
+        self.assertEqual(
+            list(xmembers([derived], test)), [('age', 40), ('name', 'larry')],
+        )
+        # names deleted before invalidating are skipped
+        del derived.age
+        self.assertNotIn('age', list(xtraverse([derived], test))[0])
+        derived.age = 40
+        base.place = 'home'
+        self.assertNotIn('place', dict(xmembers([derived], test)))
+        xinvalidate(base)
+        self.assertIn('place', dict(xmembers([derived], test)))
+        self.assertEqual(
+            list(xtraverse([derived], test))[0]['place'], 'home',
+        )
+        class other(object):  # @IgnorePep8
+            pass
+        derived.__bases__ = (other,)
+        self.assertIn(base, list(xmro([derived])))
+        xinvalidate()
+        self.assertNotIn(base, list(xmro([derived])))
+        # cached classes can still be garbage collected
+        ref = weakref.ref(derived)
+        del derived
+        gc.collect()
+        self.assertIsNone(ref())
 
     def test_xmembers(self):
         from blade.xfilter import xmembers
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+'''blade membership index tests.'''
+
+import os
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from stuf.six import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestXIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.folder)
+
+    def test_sortedindex(self):
+        from blade.xindex import SortedIndex
+        from random import Random
+        rand = Random(1)
+        allowed = set(rand.randrange(-1000, 1000) for _ in range(500))
+        for buffer in (None, 64):
+            index = SortedIndex(iter(allowed), buffer=buffer)
+            self.assertEqual(len(index), len(allowed))
+            for item in range(-1100, 1100):
+                self.assertEqual(item in index, item in allowed)
+        self.assertFalse(1 in SortedIndex())
+        self.assertEqual(len(SortedIndex([3, 3, 3])), 1)
+
+    def test_sortedindex_load(self):
+        from blade.xindex import SortedIndex, BloomIndex
+        path = os.path.join(self.folder, 'sorted')
+        SortedIndex([7, 2, 9, 2]).save(path)
+        index = SortedIndex.load(path)
+        self.assertEqual(len(index), 3)
+        self.assertEqual([i for i in range(12) if i in index], [2, 7, 9])
+        SortedIndex().save(path)
+        self.assertEqual(len(SortedIndex.load(path)), 0)
+        self.assertRaises(ValueError, BloomIndex.load, path)
+
+    def test_load_without_cast(self):
+        from blade import xindex
+        sorted_path = os.path.join(self.folder, 'sorted')
+        bloom_path = os.path.join(self.folder, 'bloom')
+        xindex.SortedIndex([7, 2, 9, 2]).save(sorted_path)
+        xindex.BloomIndex(100).extend(range(100)).save(bloom_path)
+        view, vector = xindex.memoryview, xindex.numpy
+        # read through NumPy, then through a copy, as before Python 3.3
+        xindex.memoryview = None
+        try:
+            for xindex.numpy in (vector, None):
+                index = xindex.SortedIndex.load(sorted_path)
+                self.assertEqual(
+                    [i for i in range(12) if i in index], [2, 7, 9],
+                )
+                index = xindex.BloomIndex.load(bloom_path)
+                self.assertTrue(all(i in index for i in range(100)))
+        finally:
+            xindex.memoryview, xindex.numpy = view, vector
+
+    def test_bloomindex(self):
+        from blade.xindex import BloomIndex
+        allowed = ['user%d' % i for i in range(1000)]
+        index = BloomIndex(1000, 0.01).extend(allowed)
+        self.assertTrue(all(item in index for item in allowed))
+        wrong = sum('other%d' % i in index for i in range(10000))
+        self.assertLess(wrong, 300)
+        self.assertTrue(BloomIndex(10).update('moe')('moe'))
+        self.assertFalse('moe' in BloomIndex(10))
+
+    def test_bloomindex_load(self):
+        from blade.xindex import BloomIndex, SortedIndex
+        path = os.path.join(self.folder, 'bloom')
+        BloomIndex(100, seed=3).extend(range(100)).save(path)
+        index = BloomIndex.load(path)
+        self.assertEqual(index.seed, 3)
+        self.assertTrue(all(i in index for i in range(100)))
+        self.assertLess(sum(i in index for i in range(100, 1100)), 50)
+        self.assertRaises(ValueError, SortedIndex.load, path)
+
+    def test_xindex(self):
+        from blade.xindex import xindex, BloomIndex, SortedIndex
+        from blade.xfilter import xfilter, xtruefalse
+        from blade.xpredicate import xfield
+        exact = xindex([11, 3, 5, 7])
+        self.assertIsInstance(exact, SortedIndex)
+        self.assertEqual(list(xfilter([1, 3, 5, 8, 11], exact)), [3, 5, 11])
+        self.assertEqual(
+            list(xfilter([1, 3, 5, 8, 11], exact, invert=True)), [1, 8],
+        )
+        divide = xtruefalse([1, 3, 5, 8], exact)
+        self.assertEqual(
+            (list(divide.true), list(divide.false)), ([3, 5], [1, 8]),
+        )
+        rows = [dict(id=1), dict(id=3), dict(id=8)]
+        self.assertEqual(
+            list(xfilter(rows, xfield('id').isin(exact))), [dict(id=3)],
+        )
+        probable = xindex(['moe', 'larry'], False)
+        self.assertIsInstance(probable, BloomIndex)
+        self.assertEqual(list(xfilter(['moe', 'shemp'], probable)), ['moe'])
+        self.assertRaises(TypeError, xindex, iter(['moe']), False)
+        self.assertTrue('moe' in xindex(iter(['moe']), False, 10))
+
+    @unittest.skipIf(numpy is None, 'requires NumPy')
+    def test_xindex_numpy(self):
+        from blade.xindex import xindex
+        from blade.xfilter import xfilter, xtruefalse
+        from blade.xpredicate import xfield
+        values = numpy.arange(20)
+        for exact in (True, False):
+            index = xindex([3, 5, 19, 40], exact)
+            self.assertEqual(
+                list(xfilter(values, index)), [3, 5, 19],
+            )
+            self.assertEqual(next(xtruefalse(values, index).false), 0)
+            self.assertEqual(
+                index.mask(values).nonzero()[0].tolist(), [3, 5, 19],
+            )
+            self.assertEqual(
+                xfield().isin(index).mask(values).sum(), 3,
+            )
+            # NumPy scalars tested one at a time
+            self.assertEqual(
+                [i for i in list(values) if i in index], [3, 5, 19],
+            )
+        self.assertFalse(xindex([]).mask(values).any())
@@ -3,12 +3,22 @@
 
 from stuf.six import unittest
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class TestXMath(unittest.TestCase):
 
     def test_xaverage(self):
         from blade.xmath import xaverage
         self.assertEqual(xaverage((10, 40, 45)), 31.666666666666668)
+        self.assertEqual(xaverage(iter((10, 40, 45))), 31.666666666666668)
+        self.assertEqual(
+            list(xaverage((10, 40, 45), running=True)),
+            [10.0, 25.0, 31.666666666666668],
+        )
 
     def test_xcount(self):
         from blade.xmath import xcount
@@ -18,20 +28,254 @@ class TestXMath(unittest.TestCase):
         self.assertEqual(common.most, 11)
         # least common
         self.assertEqual(common.least, 7)
+        common = xcount((11, 3, 5, 11, 7, 3, 11, 11, 3), k=2)
+        self.assertEqual(common.overall, [(11, 5), (3, 4)])
+        self.assertEqual(common.most, 11)
+        self.assertRaises(ValueError, xcount, [1, 2], k=0)
 
     def test_xmedian(self):
         from blade.xmath import xmedian
         self.assertEqual(xmedian((4, 5, 7, 2, 1)), 4)
         self.assertEqual(xmedian((4, 5, 7, 2, 1, 8)), 4.5)
+        self.assertEqual(xmedian((3, 1, 2)), 2)
+        self.assertEqual(xmedian((7, 1, 5, 3, 9, 11, 13)), 7)
+        self.assertEqual(xmedian(range(101)), 50)
+        data = [4, 5, 7, 2, 1, 8]
+        self.assertEqual(xmedian(data), 4.5)
+        self.assertEqual(data, [4, 5, 7, 2, 1, 8])
+        from random import Random
+        from operator import truediv
+        rand = Random(1)
+        for length in (1, 2, 17, 100, 101, 5000, 5001):
+            data = [rand.randrange(50) for _ in range(length)]
+            ordered = sorted(data)
+            middle = length // 2
+            if length % 2:
+                expect = ordered[middle]
+            else:
+                expect = truediv(ordered[middle - 1] + ordered[middle], 2)
+            self.assertEqual(xmedian(iter(data)), expect)
+        self.assertRaises(ValueError, xmedian, [])
+        # sorting on disk beyond a buffer
+        for length in (1, 2, 9, 10, 501, 1000):
+            data = [rand.randrange(100) for _ in range(length)]
+            for buffer in (8, 1000):
+                self.assertEqual(
+                    xmedian(iter(data), buffer=buffer), xmedian(data),
+                )
+        self.assertEqual(xmedian(iter([3, 1, 2, 4]), buffer=1), 2.5)
+        self.assertRaises(ValueError, xmedian, iter([]), buffer=4)
+        self.assertEqual(
+            list(xmedian((4, 5, 7, 2, 1, 8), running=True)),
+            [4, 4.5, 5, 4.5, 4, 4.5],
+        )
 
     def test_xminmax(self):
         from blade.xmath import xminmax
         self.assertEqual(xminmax((1, 2, 4)), (1, 4))
         self.assertEqual(xminmax((10, 5, 100, 2, 1000)), (2, 1000))
+        self.assertEqual(xminmax(iter((10, 5, 100, 2, 1000, 7))), (2, 1000))
+        self.assertEqual(xminmax([3]), (3, 3))
+        self.assertEqual(
+            xminmax(('moe', 'larry', 'curly', 'bob', 'shemp'), len),
+            ('moe', 'larry'),
+        )
+        self.assertRaises(ValueError, xminmax, [])
 
     def test_xinterval(self):
         from blade.xmath import xinterval
         self.assertEqual(xinterval((3, 5, 7, 3, 11)), 8)
+        self.assertEqual(xinterval(iter((3, 5, 7, 3, 11, 1))), 10)
+        self.assertEqual(xinterval(('moe', 'larry', 'curly'), len), 2)
+
+    def test_xvariance(self):
+        from blade.xmath import xvariance
+        data = (2, 4, 4, 4, 5, 5, 7, 9)
+        self.assertAlmostEqual(xvariance(data), 4.571428571428571)
+        self.assertAlmostEqual(xvariance(iter(data), population=True), 4.0)
+        self.assertRaises(ValueError, xvariance, [1])
+
+    def test_xstddev(self):
+        from blade.xmath import xstddev
+        data = (2, 4, 4, 4, 5, 5, 7, 9)
+        self.assertAlmostEqual(xstddev(data, population=True), 2.0)
+        self.assertAlmostEqual(xstddev(data), 2.138089935299395)
+
+    def test_xskew(self):
+        from blade.xmath import xskew
+        self.assertAlmostEqual(xskew((1, 2, 3, 10)), 1.0182337649086284)
+        self.assertAlmostEqual(xskew((1, 2, 3)), 0.0)
+
+    def test_xkurtosis(self):
+        from blade.xmath import xkurtosis
+        self.assertAlmostEqual(xkurtosis((1, 2, 3, 10)), -0.7696)
+        self.assertRaises(ValueError, xkurtosis, (1, 1, 1))
+
+    def test_moments(self):
+        from stuf.six import pickle
+        from blade.xmath import Moments
+        data = [(i * 7919) % 101 / 3.0 for i in range(1000)]
+        whole = Moments().extend(data)
+        parts = Moments().extend(data[:123])
+        for item in data[123:500]:
+            parts.update(item)
+        parts.merge(pickle.loads(pickle.dumps(Moments().extend(data[500:]))))
+        self.assertEqual(parts.count, whole.count)
+        self.assertAlmostEqual(parts.mean, whole.mean)
+        self.assertAlmostEqual(parts.variance(), whole.variance())
+        self.assertAlmostEqual(parts.skew(), whole.skew())
+        self.assertAlmostEqual(parts.kurtosis(), whole.kurtosis())
+        self.assertEqual(Moments().merge(whole).variance(), whole.variance())
+
+    def test_accumulator(self):
+        from blade.xmath import Accumulator, Tally
+        class partial(Accumulator):  # @IgnorePep8
+            def update(self, item):
+                return self
+        self.assertRaises(TypeError, partial)
+        class whole(partial):  # @IgnorePep8
+            def merge(self, other):
+                return self
+            def result(self):  # @IgnorePep8
+                return 0
+        self.assertEqual(whole().extend([1, 2]).result(), 0)
+        self.assertFalse(hasattr(Tally(), '__dict__'))
+
+    def _shards(self, factory, data, size=3):
+        from stuf.six import pickle
+        merged = factory()
+        for i in range(0, len(data), size):
+            shard = factory().extend(data[i:i + size])
+            merged.merge(pickle.loads(pickle.dumps(shard)))
+        return merged.result()
+
+    def test_total(self):
+        from blade.xmath import Total, xsum
+        data = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+        self.assertEqual(self._shards(Total, data), xsum(data))
+        floats = [.1] * 10 + [1e100, 1.0, -1e100] * 3
+        self.assertEqual(
+            self._shards(lambda: Total(precision=True), floats),
+            xsum(floats, precision=True),
+        )
+        total = Total(1)
+        for item in data:
+            total.update(item)
+        self.assertEqual(total.result(), xsum(data, 1))
+        self.assertIsNone(total.discard)
+        total = Total(precision=True).extend(floats).discard(.1)
+        self.assertEqual(total.result(), xsum(floats[1:], precision=True))
+
+    def test_tally(self):
+        from blade.xmath import Tally
+        self.assertEqual(self._shards(Tally, list(range(10))), 10)
+        self.assertEqual(Tally().update('a').update('b').result(), 2)
+        self.assertEqual(Tally().extend('abc').discard('a').result(), 2)
+
+    def test_mean(self):
+        from blade.xmath import Mean, xaverage
+        data = [10, 40, 45, 2, 7]
+        self.assertEqual(self._shards(Mean, data), xaverage(data))
+        self.assertEqual(Mean().update(10).update(20).result(), 15.0)
+        self.assertIsNone(Mean().discard)
+        from blade.xmath import Extremes
+        self.assertIsNone(Extremes().update(1).discard)
+
+    def test_extremes(self):
+        from blade.xmath import Extremes, xminmax
+        data = [10, 5, 100, 2, 1000, 7, -3]
+        self.assertEqual(self._shards(Extremes, data), xminmax(data))
+        words = ['moe', 'larry', 'curly', 'bob', 'shemp']
+        self.assertEqual(
+            self._shards(lambda: Extremes(len), words, 2), xminmax(words, len),
+        )
+        self.assertEqual(Extremes().update(3).update(1).result(), (1, 3))
+        self.assertRaises(ValueError, Extremes().result)
+
+    def test_commonality(self):
+        from blade.xmath import Commonality, xcount
+        data = [11, 3, 5, 11, 7, 3, 11, 5, 5, 2]
+        self.assertEqual(self._shards(Commonality, data), xcount(data))
+        self.assertEqual(Commonality().update(1).update(1).result().most, 1)
+
+    def test_heavyhitters(self):
+        from random import Random
+        from collections import Counter
+        from blade.xmath import HeavyHitters
+        data = [0] * 500 + [1] * 300 + [2] * 200 + list(range(100, 2100))
+        Random(1).shuffle(data)
+        exact = Counter(data)
+        hitters = self._shards(lambda: HeavyHitters(10), data, 1000)
+        self.assertEqual(
+            [i for i, _ in hitters.overall[:3]],
+            [i for i, _ in exact.most_common(3)],
+        )
+        hitters = HeavyHitters(10).extend(data)
+        for item, count in hitters.result().overall:
+            self.assertTrue(count >= exact[item])
+            self.assertTrue(count - hitters.error(item) <= exact[item])
+            self.assertTrue(hitters.error(item) <= len(data) / 10)
+        self.assertEqual(hitters.estimate('missing'), 0)
+        self.assertEqual(hitters.error('missing'), hitters._floor)
+        hitters = HeavyHitters(3).extend([1, 1, 2])
+        self.assertEqual(hitters.error('missing'), 0)
+        self.assertRaises(ValueError, HeavyHitters, 0)
+
+    def test_xfrequency(self):
+        from blade.xmath import xfrequency
+        sketch = xfrequency((11, 3, 5, 11, 7, 3, 11))
+        self.assertEqual(sketch.estimate(11), 3)
+        self.assertEqual(sketch.estimate(7), 1)
+        self.assertEqual(sketch.estimate('missing'), 0)
+        self.assertEqual(sketch.count, 7)
+
+    def test_countmin(self):
+        from collections import Counter
+        from stuf.six import pickle
+        from blade.xmath import CountMin
+        data = [i % 97 if i % 2 else i % 1000 for i in range(20000)]
+        exact = Counter(data)
+        sketch = CountMin(epsilon=.01, delta=.01).extend(data[:5000])
+        other = CountMin(epsilon=.01, delta=.01).extend(data[5000:])
+        sketch.merge(pickle.loads(pickle.dumps(other)))
+        self.assertEqual(sketch.count, len(data))
+        for item, count in exact.items():
+            estimate = sketch.estimate(item)
+            self.assertTrue(count <= estimate <= count + .01 * len(data))
+        self.assertRaises(ValueError, sketch.merge, CountMin(seed=1))
+        self.assertIs(sketch.result(), sketch)
+        from operator import itemgetter
+        from blade.xfilter import xaggregate
+        from blade.xslice import xwindow
+        rows = [('a', 1), ('b', 2), ('a', 1), ('a', 3)]
+        freq = dict(xaggregate(rows, itemgetter(0), freq=(
+            CountMin, itemgetter(1),
+        )))
+        self.assertEqual(freq['a'].freq.estimate(1), 2)
+        windows = xwindow([5, 5, 6], 2, accumulator=CountMin)
+        self.assertEqual([i.estimate(5) for i in windows], [2, 1])
+
+    def test_xquantiles(self):
+        from blade.xmath import xquantiles
+        self.assertEqual(xquantiles(range(1, 101), (.5, .9, .99)), [50, 90, 99])
+        self.assertEqual(xquantiles(range(1, 101), (0, 1)), [1, 100])
+        estimate = xquantiles(iter(range(100000)), (.5, .99), seed=1)
+        self.assertTrue(49000 <= estimate[0] <= 51000)
+        self.assertTrue(98000 <= estimate[1] <= 100000)
+        self.assertRaises(ValueError, xquantiles, [])
+
+    def test_quantilesketch(self):
+        from stuf.six import pickle
+        from blade.xmath import QuantileSketch
+        sketch = QuantileSketch(seed=1)
+        for i in range(50000):
+            sketch.update(i)
+        other = QuantileSketch(seed=2).extend(range(50000, 100000))
+        other = pickle.loads(pickle.dumps(other))
+        sketch.merge(other)
+        self.assertEqual(sketch.count, 100000)
+        self.assertTrue(49000 <= sketch.quantile(.5) <= 51000)
+        self.assertTrue(89000 <= sketch.quantile(.9) <= 91000)
 
     def test_xsum(self):
         from blade.xmath import xsum
@@ -40,3 +284,76 @@ class TestXMath(unittest.TestCase):
         self.assertEqual(
             xsum((.1, .1, .1, .1, .1, .1, .1, .1, .1, .1), precision=True), 1.0,
         )
+
+    def test_xtopk(self):
+        from blade.xmath import xbottomk, xtopk
+        from random import Random
+        rand = Random(1)
+        data = [rand.randrange(1000) for _ in range(500)]
+        for k in (0, 1, 10, 500, 600):
+            self.assertEqual(
+                list(xtopk(iter(data), k)), sorted(data, reverse=True)[:k],
+            )
+            self.assertEqual(list(xbottomk(iter(data), k)), sorted(data)[:k])
+        words = ['moe', 'larry', 'curly', 'bob', 'shemp']
+        self.assertEqual(
+            list(xtopk(words, 3, len)), ['larry', 'curly', 'shemp'],
+        )
+        self.assertEqual(list(xbottomk(words, 2, len)), ['moe', 'bob'])
+        self.assertEqual(list(xtopk([], 3)), [])
+
+    def _vectors(self, data, typecode):
+        from array import array
+        yield array(typecode, data)
+        yield memoryview(array(typecode, data))
+        if numpy is not None:
+            yield numpy.array(data, dtype=typecode)
+
+    def test_vectors(self):
+        from blade.xmath import (
+            xaverage, xbottomk, xcount, xinterval, xmedian, xminmax, xsum,
+            xtopk)
+        ints = [11, 3, 5, 11, 7, 3, 11, -2]
+        floats = [.1, 2.5, 1e16, .3, -1e16, 7.25, .1]
+        for data, typecode in ((ints, 'q'), (floats, 'd')):
+            for vector in self._vectors(data, typecode):
+                self.assertEqual(xsum(vector), xsum(data))
+                self.assertEqual(xsum(vector, 3), xsum(data, 3))
+                self.assertEqual(
+                    xsum(vector, precision=True), xsum(data, precision=True),
+                )
+                self.assertEqual(xaverage(vector), xaverage(data))
+                self.assertEqual(
+                    list(xaverage(vector, running=True)),
+                    list(xaverage(data, running=True)),
+                )
+                self.assertEqual(xmedian(vector), xmedian(data))
+                self.assertEqual(xmedian(vector[:-1]), xmedian(data[:-1]))
+                self.assertEqual(xminmax(vector), xminmax(data))
+                self.assertEqual(xinterval(vector), xinterval(data))
+                self.assertEqual(xcount(vector), xcount(data))
+                self.assertEqual(xcount(vector, k=2), xcount(data, k=2))
+                for k in (0, 1, 3, 8, 20):
+                    self.assertEqual(
+                        list(xtopk(vector, k)), list(xtopk(data, k)),
+                    )
+                    self.assertEqual(
+                        list(xbottomk(vector, k)), list(xbottomk(data, k)),
+                    )
+        from array import array
+        self.assertRaises(ValueError, xminmax, array('d'))
+        # arrays longer than one block convert to Python numbers in blocks
+        from random import Random
+        from blade.xmath import _XBLOCK
+        rand = Random(4)
+        data = [rand.uniform(-1e6, 1e6) for _ in range(2 * _XBLOCK + 17)]
+        for vector in self._vectors(data, 'd'):
+            self.assertEqual(xsum(vector), xsum(data))
+            self.assertEqual(
+                xsum(vector, precision=True), xsum(data, precision=True),
+            )
+            self.assertEqual(xaverage(vector), xaverage(data))
+            self.assertEqual(
+                list(xaverage(vector, running=True)),
+                list(xaverage(data, running=True)),
+            )
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+'''blade ordering tests.'''
+
+from stuf.six import unittest
+
+
+class TestXOrder(unittest.TestCase):
+
+    def test_xsort(self):
+        from blade.xorder import xsort
+        from random import Random
+        rand = Random(1)
+        data = [rand.randrange(100) for _ in range(2000)]
+        for buffer in (None, 64, 1999, 2000, 5000):
+            self.assertEqual(
+                list(xsort(iter(data), buffer=buffer)), sorted(data),
+            )
+            self.assertEqual(
+                list(xsort(data, reverse=True, buffer=buffer)),
+                sorted(data, reverse=True),
+            )
+        self.assertEqual(list(xsort([5, 3, 4, 3], buffer=1)), [3, 3, 4, 5])
+        self.assertEqual(list(xsort([], buffer=3)), [])
+        # more runs than are merged at once are merged in passes
+        self.assertEqual(list(xsort(iter(data), buffer=7)), sorted(data))
+        self.assertRaises(ValueError, xsort, data, buffer=0)
+
+    def test_xsort_stable(self):
+        from blade.xorder import xsort
+        from operator import itemgetter
+        from random import Random
+        rand = Random(2)
+        data = [(rand.randrange(10), i) for i in range(1000)]
+        key = itemgetter(0)
+        for reverse in (False, True):
+            for buffer in (64, 7):
+                self.assertEqual(
+                    list(xsort(data, key, reverse, buffer=buffer)),
+                    sorted(data, key=key, reverse=reverse),
+                )
+        # unorderable items with orderable keys
+        items = [{'age': 40}, {'age': 60}, {'age': 50}, {'age': 40}]
+        self.assertEqual(
+            list(xsort(items, itemgetter('age'), buffer=1)),
+            [items[0], items[3], items[2], items[1]],
+        )
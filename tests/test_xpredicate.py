@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+'''blade predicate tests.'''
+
+from stuf.six import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class stooge(object):
+
+    def __init__(self, name, age):
+        self.name = name
+        self.age = age
+
+
+class TestXPredicate(unittest.TestCase):
+
+    def test_compile(self):
+        from blade.xpredicate import xfield
+        test = (xfield('age') >= 50) & (xfield('name') != 'curly')
+        self.assertTrue(test(dict(name='larry', age=50)))
+        self.assertFalse(test(dict(name='curly', age=60)))
+        self.assertFalse(test(dict(name='moe', age=40)))
+        self.assertIs(test.compile(), test.compile())
+        test = ~(xfield(0) < 2) | (xfield(1) == 'x')
+        self.assertEqual(
+            [test(i) for i in [(1, 'y'), (1, 'x'), (3, 'y')]],
+            [False, True, True],
+        )
+        # reflected comparisons
+        self.assertTrue((40 < xfield())(45))
+        self.assertTrue((xfield('name', True).startswith('la'))(
+            stooge('larry', 50),
+        ))
+        self.assertTrue((xfield('class', True) == 1)(
+            type('record', (object,), {'class': 1}),
+        ))
+        self.assertTrue(xfield().isin([[1], [2]])([2]))
+        self.assertRaises(KeyError, xfield('place'), {})
+        self.assertRaises(TypeError, bool, xfield() == 1)
+        self.assertRaises(TypeError, lambda: 1 < xfield() < 3)
+        self.assertEqual(
+            repr((xfield('age') > 45) & xfield('x', True).isin([1])),
+            "Expression(((_i['age'] > 45) and (_i.x in frozenset([1]))))"
+            if str is bytes else
+            "Expression(((_i['age'] > 45) and (_i.x in frozenset({1}))))",
+        )
+
+    def test_xfilter(self):
+        from blade.xpredicate import xfield
+        from blade.xfilter import xfilter, xmembers, xtruefalse
+        stooges = [stooge('moe', 40), stooge('larry', 50), stooge('curly', 60)]
+        test = xfield('age', True) > 45
+        self.assertEqual(
+            [i.name for i in xfilter(stooges, test)], ['larry', 'curly'],
+        )
+        self.assertEqual(
+            [i.name for i in xfilter(stooges, test, invert=True)], ['moe'],
+        )
+        divide = xtruefalse(stooges, test)
+        self.assertEqual([i.name for i in divide.true], ['larry', 'curly'])
+        self.assertEqual([i.name for i in divide.false], ['moe'])
+        self.assertEqual(
+            list(xmembers([stooges[0]], ~xfield(0).startswith('__'))),
+            [('age', 40), ('name', 'moe')],
+        )
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_mask(self):
+        from blade.xpredicate import xfield
+        from blade.xfilter import xfilter, xtruefalse
+        records = numpy.array(
+            [('moe', 40), ('larry', 50), ('curly', 60), ('shemp', 55)],
+            dtype=[('name', 'U8'), ('age', 'i8')],
+        )
+        test = (xfield('age') > 45) & ~xfield('name').isin(['curly']) | (
+            xfield('name').startswith('mo')
+        )
+        mask = test.mask(records)
+        self.assertEqual(mask.tolist(), [True, True, False, True])
+        self.assertEqual(
+            mask.tolist(), [bool(test(record)) for record in records],
+        )
+        self.assertEqual(
+            [i['name'] for i in xfilter(records, test)],
+            ['moe', 'larry', 'shemp'],
+        )
+        self.assertEqual(
+            [i['name'] for i in xfilter(records, test, invert=True)],
+            ['curly'],
+        )
+        columns = dict(name=['moe', 'larry'], age=[40, 50])
+        self.assertEqual(test.mask(columns).tolist(), [True, True])
+        vector = numpy.arange(10)
+        divide = xtruefalse(vector, (xfield() < 3) | (xfield() >= 8))
+        self.assertEqual(list(divide.true), [0, 1, 2, 8, 9])
+        self.assertEqual(list(divide.false), [3, 4, 5, 6, 7])
+        # attribute fields of records are their columns
+        self.assertEqual(
+            (xfield('age', True) > 45).mask(records).tolist(),
+            [False, True, True, True],
+        )
+        # object arrays are tested item by item
+        people = numpy.empty(2, dtype=object)
+        people[:] = [stooge('moe', 40), stooge('larry', 50)]
+        self.assertEqual(
+            [i.name for i in xfilter(people, xfield('age', True) > 45)],
+            ['larry'],
+        )
+        rows = numpy.empty(2, dtype=object)
+        rows[:] = [dict(a=1), dict(a=2)]
+        self.assertEqual(list(xfilter(rows, xfield('a') == 2)), [dict(a=2)])
+        divide = xtruefalse(rows, xfield('a') == 2)
+        self.assertEqual(list(divide.false), [dict(a=1)])
@@ -3,6 +3,11 @@
 
 from stuf.six import unittest
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class TestXSlice(unittest.TestCase):
 
@@ -12,6 +17,205 @@ class TestXSlice(unittest.TestCase):
             list(xdice(('moe', 'larry', 'curly', 30, 40, 50, True), 2, 'x')),
             [('moe', 'larry'), ('curly', 30), (40, 50), (True, 'x')]
         )
+        data = bytearray(b'moelarrycurly')
+        chunks = list(xdice(data, 4))
+        self.assertTrue(all(isinstance(i, memoryview) for i in chunks))
+        self.assertEqual(
+            [bytes(i) for i in chunks], [b'moel', b'arry', b'curl', b'y'],
+        )
+        data[0:1] = b'M'
+        self.assertEqual(bytes(chunks[0]), b'Moel')
+        self.assertEqual(
+            [bytes(i) for i in xdice(memoryview(b'moelarry'), 3, ord('x'))],
+            [b'moe', b'lar', b'ryx'],
+        )
+        from array import array
+        self.assertEqual(
+            [i.tolist() for i in xdice(array('i', [1, 2, 3, 4, 5]), 2, 0)],
+            [[1, 2], [3, 4], [5, 0]],
+        )
+        self.assertEqual(list(xdice(b'', 2)), [])
+        # fills the buffer cannot hold slice into tuples as before
+        self.assertEqual(list(xdice(b'abc', 2, 'x')), [(97, 98), (99, 'x')])
+        self.assertEqual(
+            list(xdice(array('i', [1, 2, 3]), 2, 1.5)), [(1, 2), (3, 1.5)],
+        )
+        self.assertEqual(
+            list(xdice(bytearray(b'abc'), 2, 300)), [(97, 98), (99, 300)],
+        )
+        # only binary buffers are sliced as buffers
+        self.assertEqual(
+            list(xdice('moelarry', 3)),
+            [('m', 'o', 'e'), ('l', 'a', 'r'), ('r', 'y', None)],
+        )
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_xdice_numpy(self):
+        from blade.xslice import xdice
+        vector = numpy.arange(7)
+        chunks = list(xdice(vector, 3, -1))
+        self.assertEqual(
+            [i.tolist() for i in chunks], [[0, 1, 2], [3, 4, 5], [6, -1, -1]],
+        )
+        self.assertTrue(numpy.shares_memory(chunks[0], vector))
+        self.assertEqual(chunks[2].dtype, vector.dtype)
+        self.assertEqual(
+            [i.tolist() for i in xdice(vector, 3)],
+            [[0, 1, 2], [3, 4, 5], [6]],
+        )
+        self.assertEqual(
+            [tuple(i) for i in xdice(vector, 3, 1.5)][-1], (6, 1.5, 1.5),
+        )
+        self.assertEqual(
+            [len(i) for i in xdice(vector.reshape(7, 1), 2, 'x')],
+            [2, 2, 2, 2],
+        )
+
+    def test_xwindow(self):
+        from blade.xslice import xwindow
+        from blade.xmath import Extremes, Mean, Moments, Total
+        data = [5, 4, 3, 2, 1]
+        self.assertEqual(
+            list(xwindow(data, 3)), [(5, 4, 3), (4, 3, 2), (3, 2, 1)],
+        )
+        self.assertEqual(list(xwindow(iter(data), 2, 3)), [(5, 4), (2, 1)])
+        self.assertEqual(list(xwindow(data, 6)), [])
+        for size, step in ((0, 1), (2, 0), (-1, 1)):
+            for iterable in (data, bytearray(b'moe')):
+                self.assertRaises(ValueError, xwindow, iterable, size, step)
+        self.assertEqual(
+            list(xwindow(data, 2, accumulator=Total)), [9, 7, 5, 3],
+        )
+        self.assertEqual(
+            list(xwindow(data, 3, 2, accumulator=Mean)), [4.0, 2.0],
+        )
+        self.assertEqual(
+            list(xwindow(data, 2, accumulator=Extremes)),
+            [(4, 5), (3, 4), (2, 3), (1, 2)],
+        )
+        from random import Random
+        rand = Random(1)
+        floats = [rand.random() for _ in range(200)]
+        for variance, window in zip(
+            xwindow(floats, 20, accumulator=Moments), xwindow(floats, 20),
+        ):
+            self.assertAlmostEqual(
+                variance, Moments().extend(window).variance(),
+            )
+        class Broken(Total):
+            def discard(self, item):
+                raise NotImplementedError
+        self.assertRaises(
+            NotImplementedError, list, xwindow(data, 2, accumulator=Broken),
+        )
+        # moments refill each window so a level shift leaves no residue
+        shifted = [1e9 + rand.random() for _ in range(200)] + [5.0] * 60
+        self.assertEqual(
+            list(xwindow(shifted, 50, accumulator=Moments))[-1], 0,
+        )
+        self.assertEqual(
+            list(xwindow(shifted, 50, accumulator=Mean))[-1], 5.0,
+        )
+        self.assertEqual(
+            list(xwindow(shifted, 50, accumulator=Total))[-1], 250.0,
+        )
+        precise = lambda: Total(precision=True)
+        self.assertEqual(
+            list(xwindow(shifted, 50, accumulator=precise))[-1], 250.0,
+        )
+        buffer = bytearray(b'moelarry')
+        windows = list(xwindow(buffer, 3, 2))
+        self.assertTrue(all(isinstance(i, memoryview) for i in windows))
+        self.assertEqual(
+            [bytes(i) for i in windows], [b'moe', b'ela', b'arr'],
+        )
+        buffer[2:3] = b'E'
+        self.assertEqual(bytes(windows[1]), b'Ela')
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_xwindow_numpy(self):
+        from blade.xslice import xwindow
+        vector = numpy.arange(5)
+        windows = list(xwindow(vector, 4))
+        self.assertEqual(
+            [i.tolist() for i in windows], [[0, 1, 2, 3], [1, 2, 3, 4]],
+        )
+        self.assertTrue(numpy.shares_memory(windows[1], vector))
+
+    def test_xtimewindow(self):
+        from blade.xslice import xtimewindow
+        from blade.xmath import Extremes, Mean, Tally
+        from stuf.base import first
+        events = [(1, 'a'), (2, 'b'), (4, 'c'), (5, 'd'), (12, 'e')]
+        self.assertEqual(
+            [tuple(i) for i in xtimewindow(events, 5, first)], [
+                (0, 5, ((1, 'a'), (2, 'b'), (4, 'c'))),
+                (5, 10, ((5, 'd'),)),
+                (10, 15, ((12, 'e'),)),
+            ],
+        )
+        windows = xtimewindow(events, 4, first, 2)
+        self.assertEqual(
+            [(i.start, len(i.value)) for i in windows],
+            [(-2, 1), (0, 2), (2, 3), (4, 2), (10, 1), (12, 1)],
+        )
+        self.assertEqual(
+            [i.value for i in xtimewindow(events, 4, first, 2, Tally)],
+            [1, 2, 3, 2, 1, 1],
+        )
+        times = [1, 2, 4, 5, 12]
+        identity = lambda x: x
+        self.assertEqual(
+            [i.value for i in xtimewindow(times, 4, identity, 2, Mean)],
+            [1.0, 1.5, 11 / 3.0, 4.5, 12.0, 12.0],
+        )
+        self.assertEqual(
+            [i.value for i in xtimewindow(times, 4, identity, 2, Extremes)],
+            [(1, 1), (1, 2), (2, 5), (4, 5), (12, 12), (12, 12)],
+        )
+        self.assertEqual(list(xtimewindow([], 4, identity)), [])
+        self.assertRaises(ValueError, xtimewindow, times, 0, identity)
+        self.assertRaises(ValueError, xtimewindow, times, 4, identity, 0)
+        self.assertRaises(ValueError, xtimewindow, times, 4, identity, -2)
+        # hopping windows skip items in the gaps between them
+        self.assertEqual(
+            list(xtimewindow([0, 5], 4, identity, 7)), [(0, 4, (0,))],
+        )
+        self.assertEqual(
+            [tuple(i) for i in xtimewindow(times, 2, identity, 5, Tally)],
+            [(0, 2, 1), (5, 7, 1)],
+        )
+        from random import Random
+        rand = Random(3)
+        for _ in range(200):
+            size, step = rand.randint(1, 6), rand.randint(1, 9)
+            times = sorted(rand.randrange(40) for _ in range(8))
+            starts = range(
+                (times[0] - size) // step * step, times[-1] + 1, step,
+            )
+            expected = [
+                (start, start + size, tuple(
+                    i for i in times if start <= i < start + size
+                )) for start in starts
+            ]
+            expected = [i for i in expected if i[2]]
+            self.assertEqual(
+                [tuple(i) for i in xtimewindow(times, size, identity, step)],
+                expected,
+            )
+            self.assertEqual(
+                [i.value for i in xtimewindow(
+                    times, size, identity, step, Tally,
+                )], [len(i[2]) for i in expected],
+            )
+            self.assertEqual(
+                [i.value for i in xtimewindow(
+                    times, size, identity, step, Extremes,
+                )], [(min(i[2]), max(i[2])) for i in expected],
+            )
+        self.assertRaises(
+            ValueError, list, xtimewindow([2, 1], 4, identity),
+        )
 
     def test_xfirst(self):
         from blade.xslice import xfirst
@@ -22,15 +226,34 @@ class TestXSlice(unittest.TestCase):
         from blade.xslice import xat
         self.assertEqual(xat((5, 4, 3, 2, 1), 2), 3)
         self.assertEqual(xat((5, 4, 3, 2, 1), 10, 11), 11)
+        self.assertEqual(xat(iter((5, 4, 3, 2, 1)), 2), 3)
+        self.assertEqual(xat(range(5, 0, -1), 4), 1)
+        self.assertEqual(xat(iter(()), 4, 'x'), 'x')
 
     def test_xlast(self):
+        from collections import deque
         from blade.xslice import xlast
         self.assertEqual(list(xlast((5, 4, 3, 2, 1))), [1])
         self.assertEqual(list(xlast((5, 4, 3, 2, 1), 2)), [2, 1])
+        self.assertEqual(list(xlast(range(5, 0, -1), 2)), [2, 1])
+        self.assertEqual(list(xlast(range(5, 0, -1))), [1])
+        self.assertEqual(list(xlast(iter((5, 4, 3, 2, 1)), 2)), [2, 1])
+        self.assertEqual(list(xlast(memoryview(b'abc'), 2)), [98, 99])
+        self.assertEqual(list(xlast(deque([1, 2, 3]), 2)), [2, 3])
+        self.assertEqual(list(xlast(deque([1, 2, 3]), 5)), [1, 2, 3])
+        self.assertRaises(IndexError, list, xlast([]))
+        self.assertEqual(list(xlast(iter((2, 1)), 5)), [2, 1])
+        self.assertEqual(list(xlast(iter(()), 2)), [])
 
     def test_xinitial(self):
         from blade.xslice import xinitial
         self.assertEqual(list(xinitial([5, 4, 3, 2, 1])), [5, 4, 3, 2])
+        self.assertEqual(list(xinitial(iter([5, 4, 3, 2, 1]))), [5, 4, 3, 2])
+        self.assertEqual(list(xinitial(range(3))), [0, 1])
+        self.assertEqual(list(xinitial([])), [])
+        self.assertEqual(list(xinitial(iter([1]))), [])
+        from itertools import count, islice
+        self.assertEqual(list(islice(xinitial(count()), 3)), [0, 1, 2])
 
     def test_xrest(self):
         from blade.xslice import xrest
@@ -39,7 +262,55 @@ class TestXSlice(unittest.TestCase):
     def test_xchoice(self):
         from blade.xslice import xchoice
         self.assertEqual(len([xchoice([1, 2, 3, 4, 5, 6])]), 1)
+        self.assertIn(xchoice(iter([1, 2, 3, 4, 5, 6])), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(
+            xchoice(iter(range(1000)), seed=2),
+            xchoice(iter(range(1000)), seed=2),
+        )
+        self.assertEqual(
+            xchoice(range(1000), seed=2), xchoice(range(1000), seed=2),
+        )
+        self.assertIn(xchoice(memoryview(b'abc')), [97, 98, 99])
+        self.assertRaises(ValueError, xchoice, [])
+        self.assertRaises(ValueError, xchoice, iter([]))
 
     def test_xsample(self):
         from blade.xslice import xsample
         self.assertEqual(len(list(xsample([1, 2, 3, 4, 5, 6], 3))), 3)
+        sample = list(xsample(iter(range(10000)), 10))
+        self.assertEqual(len(set(sample)), 10)
+        self.assertTrue(all(0 <= i < 10000 for i in sample))
+        self.assertEqual(sorted(xsample([1, 2], 5)), [1, 2])
+        from random import Random
+        self.assertEqual(
+            list(xsample(range(10000), 10, random=Random(3))),
+            list(xsample(iter(range(10000)), 10, seed=3)),
+        )
+        weighted = list(xsample(
+            iter(range(1000)), 5, weight=lambda x: x % 2, seed=1,
+        ))
+        self.assertEqual(len(weighted), 5)
+        self.assertTrue(all(i % 2 for i in weighted))
+
+    def test_reservoir(self):
+        from stuf.six import pickle
+        from blade.xslice import Reservoir
+        shards = [
+            Reservoir(10, seed=i).extend(iter(range(i * 100, i * 100 + 100)))
+            for i in range(5)
+        ]
+        merged = Reservoir(10)
+        for shard in shards:
+            merged.merge(pickle.loads(pickle.dumps(shard)))
+        sample = merged.result()
+        self.assertEqual(merged.count, 500)
+        self.assertEqual(len(set(sample)), 10)
+        self.assertTrue(all(0 <= i < 500 for i in sample))
+        heavy = Reservoir(2, weight=lambda x: 1e9 if x in (3, 7) else 1)
+        for item in range(100):
+            heavy.update(item)
+        self.assertEqual(sorted(heavy.result()), [3, 7])
+        self.assertEqual(
+            Reservoir(3, seed=4).extend(range(50)).result(),
+            Reservoir(3, seed=4).extend(iter(range(50))).result(),
+        )